@@ -0,0 +1,114 @@
+# app/celery_app/runtime.py
+"""
+Long-lived asyncio runtime for a Celery worker process: one event loop, one
+pooled aiohttp session and one asyncio Redis client, created when the worker
+process boots and closed when it shuts down. Tasks run their coroutines with
+run() instead of asyncio.run() so connections are reused across tasks.
+"""
+
+import asyncio
+import aiohttp
+from contextlib import asynccontextmanager
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from app.redis.redis_instance import create_async_redis_client
+from app.utils.logger import logger
+
+loop = None
+session = None
+redis_client = None
+
+
+def get_loop():
+    global loop
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return loop
+
+
+async def start():
+    global session, redis_client
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=8,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+            enable_cleanup_closed=True,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+    if redis_client is None:
+        redis_client = create_async_redis_client()
+
+
+async def stop():
+    global session, redis_client
+    if session is not None:
+        await session.close()
+        session = None
+    if redis_client is not None:
+        await redis_client.close()
+        redis_client = None
+
+
+async def run_started(coro, timeout=None):
+    await start()
+    return await asyncio.wait_for(coro, timeout)
+
+
+def run(coro, timeout=None):
+    """
+    Run `coro` to completion on the worker's event loop. With a `timeout` it
+    is cancelled after that many seconds and asyncio.TimeoutError is raised.
+    """
+    return get_loop().run_until_complete(run_started(coro, timeout))
+
+
+def on_runtime_loop():
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+def http_session():
+    """
+    The pooled session when called from the runtime loop, otherwise None so
+    the caller opens its own (e.g. when a module is run as a script).
+    """
+    if on_runtime_loop() and session is not None and not session.closed:
+        return session
+    return None
+
+
+@asynccontextmanager
+async def async_redis():
+    """
+    The shared asyncio Redis client on the runtime loop; elsewhere a fresh
+    client that is closed on exit, since its connections cannot outlive the
+    loop they were opened on.
+    """
+    if on_runtime_loop() and redis_client is not None:
+        yield redis_client
+        return
+    client = create_async_redis_client()
+    try:
+        yield client
+    finally:
+        await client.close()
+
+
+@worker_process_init.connect
+def start_runtime(**kwargs):
+    run(asyncio.sleep(0))
+    logger.info("Worker async runtime started")
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_runtime(**kwargs):
+    if loop is None or loop.is_closed():
+        return
+    loop.run_until_complete(stop())
+    loop.close()
+    logger.info("Worker async runtime stopped")
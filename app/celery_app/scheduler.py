@@ -0,0 +1,146 @@
+# app/celery_app/scheduler.py
+import time
+from app.utils.logger import logger
+
+# (min, initial, max) polling interval in seconds per source type. The
+# initial interval matches the crontab each type used to be polled on
+POLL_BOUNDS = {
+    "news": (5 * 60, 25 * 60, 2 * 60 * 60),
+    "discord": (2 * 60, 15 * 60, 60 * 60),
+    "youtube": (30 * 60, 30 * 60, 6 * 60 * 60),
+}
+
+# Weight of the latest observation in the smoothed update rate
+RATE_SMOOTHING = 0.3
+
+# Push each due source in ARGV (id, retry time pairs after the current time)
+# back to its retry time and return the ids claimed. Checking and pushing back
+# in one step means a source is claimed by one dispatcher only
+CLAIM_DUE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local claimed = {}
+for index = 2, #ARGV, 2 do
+    local score = redis.call("ZSCORE", KEYS[1], ARGV[index])
+    if score and tonumber(score) <= now then
+        redis.call("ZADD", KEYS[1], ARGV[index + 1], ARGV[index])
+        table.insert(claimed, ARGV[index])
+    end
+end
+return claimed
+"""
+
+
+class AdaptiveScheduler:
+    """
+    Polling schedule kept in a Redis sorted set of source id -> next poll
+    time. After every poll the source's update rate (new items per second)
+    is smoothed with an EWMA. The next poll is scheduled for when one new
+    item is expected, within the bounds of the source type, so busy sources
+    are polled often and quiet ones back off towards the maximum. Failed
+    polls leave the rate alone and are retried with exponential backoff from
+    the minimum interval.
+    """
+
+    due_key = "schedule:due"
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.claim_script = redis_client.register_script(CLAIM_DUE_SCRIPT)
+
+    @staticmethod
+    def stats_key(source_id):
+        return f"schedule:stats:{source_id}"
+
+    @staticmethod
+    def bounds(source_id):
+        return POLL_BOUNDS[source_id.split(":", 1)[0]]
+
+    def register(self, source_ids):
+        """
+        Add sources that are not scheduled yet, due immediately.
+        """
+        now = time.time()
+        self.redis_client.zadd(self.due_key, {source_id: now for source_id in source_ids}, nx=True)
+
+    def claim_due(self, source_ids):
+        """
+        Return the due sources among `source_ids` and push them back by their
+        maximum interval, so a poll that never reports is retried eventually.
+        """
+        now = time.time()
+        args = [now]
+        for source_id in source_ids:
+            args += [source_id, now + self.bounds(source_id)[2]]
+        return [
+            member.decode("utf-8")
+            for member in self.claim_script(keys=[self.due_key], args=args)
+        ]
+
+    def next_interval(self, source_id, rate):
+        low, initial, high = self.bounds(source_id)
+        if rate is None:
+            return initial
+        if rate <= 0:
+            return high
+        return min(high, max(low, 1 / rate))
+
+    def load_stats(self, source_id):
+        return {
+            field.decode("utf-8"): float(value)
+            for field, value in self.redis_client.hgetall(self.stats_key(source_id)).items()
+        }
+
+    def record_poll(self, source_id, new_items, timestamps=()):
+        """
+        Update the source's rate estimate from a finished poll and schedule
+        its next one. `timestamps` are the publish times of the new items.
+        """
+        now = time.time()
+        stats = self.load_stats(source_id)
+        timestamps = sorted(timestamp for timestamp in timestamps if timestamp)
+
+        last_poll = stats.get("last_poll")
+        if last_poll:
+            sample = new_items / max(now - last_poll, 1)
+        elif len(timestamps) > 1 and timestamps[-1] > timestamps[0]:
+            # First poll: estimate from how far apart the items were published
+            sample = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+        else:
+            sample = None
+
+        rate = stats.get("rate")
+        if sample is not None:
+            rate = sample if rate is None else RATE_SMOOTHING * sample + (1 - RATE_SMOOTHING) * rate
+        interval = self.next_interval(source_id, rate)
+
+        mapping = {"last_poll": now, "interval": interval, "failures": 0}
+        if rate is not None:
+            mapping["rate"] = rate
+        if timestamps:
+            mapping["last_item"] = max(timestamps[-1], stats.get("last_item", 0))
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(self.stats_key(source_id), mapping=mapping)
+            pipe.zadd(self.due_key, {source_id: now + interval})
+            pipe.execute()
+        logger.info(
+            f"{source_id}: {new_items} new items, next poll in {interval / 60:.1f} minutes"
+        )
+
+    def record_failure(self, source_id):
+        """
+        Schedule a retry of a poll that failed. The rate estimate and the
+        time of the last successful poll are kept, so the items published
+        meanwhile count towards the rate once the source recovers.
+        """
+        now = time.time()
+        low, _, high = self.bounds(source_id)
+        failures = int(self.load_stats(source_id).get("failures", 0)) + 1
+        interval = min(high, low * 2 ** (failures - 1))
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(self.stats_key(source_id), mapping={"failures": failures, "interval": interval})
+            pipe.zadd(self.due_key, {source_id: now + interval})
+            pipe.execute()
+        logger.warning(
+            f"{source_id}: poll failed {failures} times in a row, "
+            f"retrying in {interval / 60:.1f} minutes"
+        )
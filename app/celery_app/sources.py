@@ -0,0 +1,68 @@
+# app/celery_app/sources.py
+CARDANO_FEED_URLS = [
+    "https://newsbtc.com/analysis/ada/feed/",
+    "https://newsbtc.com/news/cardano/feed/",
+    "https://cointelegraph.com/rss/tag/cardano/",
+    "https://cryptoslate.com/news/cardano/feed/",
+    "https://dailycoin.com/cardano-ada/feed/",
+    "https://zycrypto.com/tag/cardano/feed/",
+    "https://zycrypto.com/tag/adausd/feed/",
+    "https://zycrypto.com/tag/ada/feed/",
+    "https://watcher.guru/news/category/cardano/feed/",
+]
+GENERIC_FEED_URLS = [
+    "https://coindesk.com/arc/outboundfeeds/rss/",
+    "https://cryptonews.com/news/feed/",
+    "https://beincrypto.com/feed/",
+    "https://crypto.news/feed/",
+    "https://bitcoinist.com/feed/",
+    "https://cryptopotato.com/feed/",
+    "https://cryptobriefing.com/feed/",
+    "https://dailyhodl.com/feed/",
+    "https://news.bitcoin.com/feed/",
+    "https://forkast.news/feed/",
+    "https://ambcrypto.com/feed/",
+    "https://cryptoglobe.com/rss/feed.xml",
+]
+CARDANO_KEYWORDS = ["cardano", "hoskinson", "ada", "iohk", "iog", "$ada"]
+
+# (feed_url, keywords) pairs; Cardano feeds are taken unfiltered
+NEWS_FEEDS = [(url, []) for url in CARDANO_FEED_URLS] + [
+    (url, CARDANO_KEYWORDS) for url in GENERIC_FEED_URLS
+]
+
+DISCORD_SERVERS = [
+    {
+        "project": "Indiego",
+        "server": "816779565796032513",
+        "channels": ["834798371872047125"],
+    },
+    {
+        "project": "Meld",
+        "server": "850372362033430539",
+        "channels": ["860121140827127848"],
+    },
+    {
+        "project": "Iagon",
+        "server": "837215135999197246",
+        "channels": ["846654998096117791"],
+    },
+    {
+        "project": "Hosky",
+        "server": "903302807346630656",
+        "channels": ["903853505356386384"],
+    },
+    {
+        "project": "Wingriders",
+        "server": "915937361286795334",
+        "channels": ["915937634143043694"],
+    },
+]
+DISCORD_CHANNELS = [
+    {"server": server["server"], "channel": channel, "project": server["project"]}
+    for server in DISCORD_SERVERS
+    for channel in server["channels"]
+]
+
+YOUTUBE_KEYWORDS = ["cardano", "singularity net", "hoskinson"]
+YOUTUBE_MAX_RESULTS = 3
@@ -1,5 +1,16 @@
-from .news_tasks import broadcast_news_data
-from .discord_tasks import broadcast_discord_data
-from .youtube_tasks import broadcast_youtube_data
+from .news_tasks import broadcast_news_data, fetch_news_feed
+from .discord_tasks import broadcast_discord_data, fetch_discord_channel
+from .youtube_tasks import broadcast_youtube_data, fetch_youtube_videos
+from .fanout import aggregate_results
+from .schedule_tasks import dispatch_due_sources
 
-__all__ = ["broadcast_news_data", "broadcast_discord_data", "broadcast_youtube_data"]
+__all__ = [
+    "broadcast_news_data",
+    "broadcast_discord_data",
+    "broadcast_youtube_data",
+    "fetch_news_feed",
+    "fetch_discord_channel",
+    "fetch_youtube_videos",
+    "aggregate_results",
+    "dispatch_due_sources",
+]
@@ -1,16 +1,22 @@
 import os
-import re
 import asyncio
-import aiohttp
-from datetime import datetime
 from dotenv import load_dotenv
-from contextlib import asynccontextmanager
 from app.utils.logger import logger
+from app.utils.records import Message, iso_timestamp
+from app.redis.cache import LRUCache, TieredCache
+from app.celery_app.runtime import async_redis, http_session
+from .fetcher import Fetcher, SourceUnavailable
+from .discord_ratelimit import DiscordRateLimiter
+from .discord_mentions import collect_mentions, render_mentions
 
 load_dotenv()
 
 DISCORD_API_TOKEN = os.getenv("DISCORD_API_TOKEN")
 
+INITIAL_MESSAGE_LIMIT = 3
+MESSAGE_PAGE_SIZE = 100
+MAX_MESSAGE_PAGES = 10
+
 
 def log_error(logger, message, error=None):
     if error:
@@ -19,260 +25,266 @@ def log_error(logger, message, error=None):
         logger.error(message)
 
 
-ROLE_MENTION_PATTERN = re.compile(r"<@&(\d+)>")
-CHANNEL_MENTION_PATTERN = re.compile(r"<#(\d+)>")
-USER_MENTION_PATTERN = re.compile(r"<@(\d+)>")
-EMOJI_MENTION_PATTERN = re.compile(r"<:[a-zA-Z0-9_]+:(\d+)>")
-
-
-@asynccontextmanager
-async def create_session():
-    session = aiohttp.ClientSession()
-    try:
-        yield session
-    finally:
-        await session.close()
-
-
-async def fetch_roles_info(guild_id, retries=3, delay=5):
+async def fetch_roles_info(fetcher, guild_id):
     api_url = f"https://discord.com/api/v9/guilds/{guild_id}/roles"
     headers = {"Authorization": DISCORD_API_TOKEN}
 
-    async with create_session() as session:
-        for attempt in range(retries):
-            try:
-                async with session.get(api_url, headers=headers) as response:
-                    if response.status == 200:
-                        roles_info = await response.json()
-                        return roles_info
-                    else:
-                        log_error(
-                            logger,
-                            f"Failed to fetch roles info for guild ID {guild_id}",
-                            response.status,
-                        )
-            except aiohttp.ClientError as e:
-                log_error(
-                    logger, f"Error fetching roles info for guild ID {guild_id}", e
-                )
-
-            if attempt < retries - 1:
-                logger.info(f"Retrying in {delay} seconds...")
-                await asyncio.sleep(delay)
-
-    log_error(
-        logger,
-        f"Failed to fetch roles info after {retries} attempts for guild ID {guild_id}",
-    )
-    return None
+    response = await fetcher.fetch(api_url, headers=headers)
+    if response is None:
+        log_error(logger, f"Failed to fetch roles info for guild ID {guild_id}")
+        return None
+    return response.body
 
 
-async def fetch_channel_info(channel_id, retries=3, delay=5):
+async def fetch_channel_info(fetcher, channel_id):
     api_url = f"https://discord.com/api/v9/channels/{channel_id}"
     headers = {"Authorization": DISCORD_API_TOKEN}
 
-    async with create_session() as session:
-        for attempt in range(retries):
-            try:
-                async with session.get(api_url, headers=headers) as response:
-                    if response.status == 200:
-                        channel_info = await response.json()
-                        return channel_info
-                    else:
-                        log_error(
-                            logger,
-                            f"Failed to fetch channel info for channel ID {channel_id}",
-                            response.status,
-                        )
-            except aiohttp.ClientError as e:
-                log_error(
-                    logger,
-                    f"Error fetching channel info for channel ID {channel_id}",
-                    e,
-                )
-
-            if attempt < retries - 1:
-                logger.info(f"Retrying in {delay} seconds...")
-                await asyncio.sleep(delay)
-
-    log_error(
-        logger,
-        f"Failed to fetch channel info after {retries} attempts for channel ID {channel_id}",
-    )
-    return None
-
+    response = await fetcher.fetch(api_url, headers=headers)
+    if response is None:
+        log_error(logger, f"Failed to fetch channel info for channel ID {channel_id}")
+        return None
+    return response.body
 
-def fetch_emoji_info(emoji_id):
-    return f"https://cdn.discordapp.com/emojis/{emoji_id}.webp?size=44&quality=lossless"
 
-
-async def fetch_user_info(user_id, retries=3, delay=5):
+async def fetch_user_info(fetcher, user_id):
     api_url = f"https://discord.com/api/v9/users/{user_id}"
     headers = {"Authorization": DISCORD_API_TOKEN}
 
-    async with create_session() as session:
-        for attempt in range(retries):
-            try:
-                async with session.get(api_url, headers=headers) as response:
-                    if response.status == 200:
-                        user_info = await response.json()
-                        return user_info
-                    else:
-                        log_error(
-                            logger,
-                            f"Failed to fetch user info for user ID {user_id}",
-                            response.status,
-                        )
-            except aiohttp.ClientError as e:
-                log_error(logger, f"Error fetching user info for user ID {user_id}", e)
-
-            if attempt < retries - 1:
-                logger.info(f"Retrying in {delay} seconds...")
-                await asyncio.sleep(delay)
-
-    log_error(
-        logger,
-        f"Failed to fetch user info after {retries} attempts for user ID {user_id}",
+    response = await fetcher.fetch(api_url, headers=headers)
+    if response is None:
+        log_error(logger, f"Failed to fetch user info for user ID {user_id}")
+        return None
+    return response.body
+
+
+async def fetch_roles_index(fetcher, guild_id):
+    roles = await fetch_roles_info(fetcher, guild_id)
+    if roles is None:
+        return None
+    return {str(role["id"]): role for role in roles}
+
+
+# Local tiers outlive a single run; the Redis tier is shared by all workers
+user_cache = LRUCache(maxsize=5000, ttl=600)
+channel_cache = LRUCache(maxsize=2000, ttl=600)
+roles_cache = LRUCache(maxsize=100, ttl=300)
+
+
+class DiscordLookups:
+    """
+    Cached user, channel and guild role lookups for one run. Roles are kept
+    as a dict indexed by role id.
+    """
+
+    def __init__(self, fetcher, redis_client):
+        self.fetcher = fetcher
+        self.users = TieredCache(redis_client, "discord:user", 24 * 60 * 60, user_cache)
+        self.channels = TieredCache(
+            redis_client, "discord:channel", 24 * 60 * 60, channel_cache
+        )
+        self.roles = TieredCache(redis_client, "discord:roles", 60 * 60, roles_cache)
+
+    async def user(self, user_id):
+        return await self.users.get(
+            user_id, lambda: fetch_user_info(self.fetcher, user_id)
+        )
+
+    async def channel(self, channel_id):
+        return await self.channels.get(
+            channel_id, lambda: fetch_channel_info(self.fetcher, channel_id)
+        )
+
+    async def guild_roles(self, guild_id):
+        return await self.roles.get(
+            guild_id, lambda: fetch_roles_index(self.fetcher, guild_id)
+        )
+
+
+async def resolve_names(lookup, ids, field):
+    ids = list(ids)
+    infos = await asyncio.gather(*(lookup(id) for id in ids), return_exceptions=True)
+    names = {}
+    for id, info in zip(ids, infos):
+        if isinstance(info, Exception):
+            log_error(logger, "Error fetching user or channel info", info)
+        elif info and field in info:
+            names[id] = info[field]
+    return names
+
+
+async def resolve_role_names(lookups, server_id, role_ids):
+    if not role_ids:
+        return {}
+    try:
+        roles = await lookups.guild_roles(server_id) or {}
+    except Exception as e:
+        log_error(logger, f"Error fetching roles info for guild ID {server_id}", e)
+        return {}
+    return {role_id: roles[role_id]["name"] for role_id in role_ids if role_id in roles}
+
+
+async def process_discord_text(lookups, server_id, text):
+    user_ids, channel_ids, role_ids = collect_mentions(text)
+    # Resolve every mention of the message in one batch, then render once
+    users, channels, roles = await asyncio.gather(
+        resolve_names(lookups.user, user_ids, "username"),
+        resolve_names(lookups.channel, channel_ids, "name"),
+        resolve_role_names(lookups, server_id, role_ids),
     )
-    return None
-
-
-def get_discord_ids(pattern, message_text):
-    ids = []
-    for string in message_text.split("\n"):
-        matches = pattern.findall(string)
-        ids.extend(matches)
-    return ids
-
-
-def find_role_by_id(role_id, all_roles):
-    for role in all_roles:
-        if str(role["id"]) == role_id:
-            return role
-    return None
-
-
-async def process_discord_text(server_id, text):
-    role_ids = get_discord_ids(ROLE_MENTION_PATTERN, text)
-    channel_ids = get_discord_ids(CHANNEL_MENTION_PATTERN, text)
-    user_ids = get_discord_ids(USER_MENTION_PATTERN, text)
-    emoji_ids = get_discord_ids(EMOJI_MENTION_PATTERN, text)
-
-    tasks = []
-    if emoji_ids:
-        for emoji_id in emoji_ids:
-            emoji_url = fetch_emoji_info(emoji_id)
-            text = re.sub(
-                EMOJI_MENTION_PATTERN, f'<img src="{emoji_url}" alt="emoji">', text
-            )
-
-    if user_ids:
-        for user_id in user_ids:
-            task = asyncio.ensure_future(fetch_user_info(user_id))
-            tasks.append(task)
-
-    if channel_ids:
-        for channel_id in channel_ids:
-            task = asyncio.ensure_future(fetch_channel_info(channel_id))
-            tasks.append(task)
-
-    user_infos = await asyncio.gather(*tasks, return_exceptions=True)
-    for user_info in user_infos:
-        if isinstance(user_info, Exception):
-            log_error(logger, "Error fetching user or channel info", user_info)
-        elif user_info:
-            if "username" in user_info:
-                user_name = user_info["username"]
-                user_id = user_info["id"]
-                text = text.replace(f"<@{user_id}>", f"@{user_name}")
-            elif "name" in user_info:
-                channel_name = user_info["name"]
-                channel_id = user_info["id"]
-                text = text.replace(f"<#{channel_id}>", f"#{channel_name}")
-
-    if role_ids:
-        all_roles = await fetch_roles_info(server_id)
-        for role_id in role_ids:
-            role = find_role_by_id(role_id, all_roles)
-            if role:
-                text = text.replace(f"<@&{role_id}>", f"@{role['name']}")
-
-    return text
-
-
-async def fetch_messages(
-    session, server_id, channel_id, project_name, retries=3, delay=5
-):
-    api_url = f"https://discord.com/api/v9/channels/{channel_id}/messages?limit=3"
+    return render_mentions(text, users, channels, roles)
+
+
+class ChannelCursors:
+    """
+    Last seen message id per channel, kept in a single Redis hash. Cursors are
+    loaded once before a run and written back once after it.
+    """
+
+    key = "discord:cursors"
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.cursors = {}
+        self.updated = {}
+
+    async def load(self):
+        cursors = await self.redis_client.hgetall(self.key)
+        self.cursors = {
+            channel_id.decode("utf-8"): message_id.decode("utf-8")
+            for channel_id, message_id in cursors.items()
+        }
+
+    def get(self, channel_id):
+        return self.cursors.get(channel_id)
+
+    def advance(self, channel_id, message_id):
+        current = self.cursors.get(channel_id)
+        if current is None or int(message_id) > int(current):
+            self.cursors[channel_id] = message_id
+            self.updated[channel_id] = message_id
+
+    async def save(self):
+        if self.updated:
+            await self.redis_client.hset(self.key, mapping=self.updated)
+            self.updated = {}
+
+
+async def fetch_new_messages(fetcher, channel_id, after=None):
+    """
+    Fetch the raw messages posted in a channel after message id `after`,
+    oldest first, paging through with limit=100 until caught up. Without a
+    cursor only the latest INITIAL_MESSAGE_LIMIT messages are fetched.
+    """
+    api_url = f"https://discord.com/api/v9/channels/{channel_id}/messages"
     headers = {"Authorization": DISCORD_API_TOKEN}
 
-    for attempt in range(retries):
-        try:
-            async with session.get(api_url, headers=headers) as response:
-                if response.status == 200:
-                    messages = await response.json()
-                    return [
-                        {
-                            "message_id": message["id"],
-                            "message_project": project_name,
-                            "message_text": await process_discord_text(
-                                server_id, message["content"]
-                            ),
-                            "message_author": message["author"]["global_name"],
-                            "message_channel_id": message["channel_id"],
-                            "message_server_id": message["id"],
-                            "message_date": int(
-                                datetime.fromisoformat(message["timestamp"]).timestamp()
-                            ),
-                            "message_attachments": [
-                                attachment["url"].replace(" ", "")
-                                for attachment in message["attachments"]
-                            ],
-                        }
-                        for message in messages
-                    ]
-                else:
-                    logger.warning(
-                        f"Failed to fetch messages for server {server_id} and channel {channel_id}"
-                    )
-        except aiohttp.ClientError as e:
-            logger.error(
-                f"Error fetching messages for server {server_id} and channel {channel_id}, error: {e}"
-            )
+    if after is None:
+        response = await fetcher.fetch(
+            api_url, headers=headers, params={"limit": INITIAL_MESSAGE_LIMIT}
+        )
+        if response is None:
+            return None
+        return sorted(response.body, key=lambda message: int(message["id"]))
+
+    messages = []
+    for _ in range(MAX_MESSAGE_PAGES):
+        response = await fetcher.fetch(
+            api_url, headers=headers, params={"after": after, "limit": MESSAGE_PAGE_SIZE}
+        )
+        if response is None:
+            # Keep what was fetched; the cursor only advances past it
+            return messages or None
+        page = sorted(response.body, key=lambda message: int(message["id"]))
+        messages.extend(page)
+        if len(page) < MESSAGE_PAGE_SIZE:
+            break
+        after = page[-1]["id"]
+    else:
+        logger.warning(
+            f"Channel {channel_id} has more than {MAX_MESSAGE_PAGES} pages of new messages"
+        )
+    return messages
+
+
+async def fetch_messages(fetcher, lookups, cursors, server_id, channel_id, project_name):
+    after = cursors.get(channel_id) if cursors else None
+    messages = await fetch_new_messages(fetcher, channel_id, after)
+    if messages is None:
+        logger.error(
+            f"Failed to fetch messages for server {server_id} and channel {channel_id}"
+        )
+        return None
+    if cursors and messages:
+        cursors.advance(channel_id, messages[-1]["id"])
+    return [
+        Message(
+            message_id=message["id"],
+            message_project=project_name,
+            message_text=await process_discord_text(
+                lookups, server_id, message["content"]
+            ),
+            message_author=message["author"].get("global_name"),
+            message_channel_id=message["channel_id"],
+            message_server_id=server_id,
+            message_date=iso_timestamp(message["timestamp"]),
+            message_attachments=[
+                attachment["url"].replace(" ", "")
+                for attachment in message["attachments"]
+            ],
+        )
+        for message in messages
+    ]
 
-        if attempt < retries - 1:
-            logger.info(f"Retrying in {delay} seconds...")
-            await asyncio.sleep(delay)
 
-    logger.error(
-        f"Failed to fetch messages after {retries} attempts for server {server_id} and channel {channel_id}"
-    )
-    return []
-
-
-async def fetch_discord_data(channels):
-    async with aiohttp.ClientSession() as session:
-        try:
-            tasks = []
-            for channel in channels:
-                server_id = channel["server"]
-                channel_id = channel["channel"]
-                project_name = channel["project"]
-                task = asyncio.ensure_future(
-                    fetch_messages(session, server_id, channel_id, project_name)
-                )
-                tasks.append(task)
-
-            all_messages = await asyncio.gather(*tasks)
-            flattened_messages = [
-                message
-                for server_messages in all_messages
-                for message in server_messages
-            ]
-            return flattened_messages
-        except Exception as e:
-            logger.exception(f"Error in fetch_discord_data function: {e}")
-            return []
+async def fetch_discord_data(channels, use_cursors=True):
+    """
+    Fetch the messages of every channel. With `use_cursors` only messages
+    posted since the previous run are returned; otherwise the latest
+    INITIAL_MESSAGE_LIMIT per channel, without touching the cursors. Raises
+    SourceUnavailable if no channel could be fetched.
+    """
+    async with async_redis() as redis_client:
+        limiter = DiscordRateLimiter(redis_client)
+        await limiter.load_routes()
+        async with Fetcher(session=http_session(), limiter=limiter) as fetcher:
+            try:
+                lookups = DiscordLookups(fetcher, redis_client)
+                cursors = None
+                if use_cursors:
+                    cursors = ChannelCursors(redis_client)
+                    await cursors.load()
+                tasks = []
+                for channel in channels:
+                    server_id = channel["server"]
+                    channel_id = channel["channel"]
+                    project_name = channel["project"]
+                    task = asyncio.ensure_future(
+                        fetch_messages(
+                            fetcher, lookups, cursors, server_id, channel_id, project_name
+                        )
+                    )
+                    tasks.append(task)
+
+                all_messages = await asyncio.gather(*tasks)
+                flattened_messages = [
+                    message
+                    for server_messages in all_messages
+                    if server_messages is not None
+                    for message in server_messages
+                ]
+                if cursors:
+                    await cursors.save()
+                if all_messages and all(messages is None for messages in all_messages):
+                    raise SourceUnavailable(", ".join(channel["channel"] for channel in channels))
+                return flattened_messages
+            except SourceUnavailable:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in fetch_discord_data function: {e}")
+                return []
+            finally:
+                await limiter.flush_metrics()
 
 
 if __name__ == "__main__":
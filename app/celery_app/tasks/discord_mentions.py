@@ -0,0 +1,47 @@
+import re
+
+# One pattern for every mention kind, so a message is scanned once
+MENTION_PATTERN = re.compile(
+    r"<(?:@&(?P<role>\d+)|#(?P<channel>\d+)|@!?(?P<user>\d+)|a?:\w+:(?P<emoji>\d+))>"
+)
+
+
+def emoji_url(emoji_id):
+    return f"https://cdn.discordapp.com/emojis/{emoji_id}.webp?size=44&quality=lossless"
+
+
+def collect_mentions(text):
+    """
+    Return the distinct user, channel and role ids mentioned in `text`.
+    """
+    user_ids, channel_ids, role_ids = set(), set(), set()
+    for match in MENTION_PATTERN.finditer(text):
+        if match.group("user"):
+            user_ids.add(match.group("user"))
+        elif match.group("channel"):
+            channel_ids.add(match.group("channel"))
+        elif match.group("role"):
+            role_ids.add(match.group("role"))
+    return user_ids, channel_ids, role_ids
+
+
+def render_mentions(text, users, channels, roles):
+    """
+    Replace every mention in `text` in a single substitution pass. `users`,
+    `channels` and `roles` map ids to display names; mentions that could not
+    be resolved are left untouched and emojis become <img> tags.
+    """
+
+    def replace(match):
+        if match.group("emoji"):
+            return f'<img src="{emoji_url(match.group("emoji"))}" alt="emoji">'
+        if match.group("user"):
+            name = users.get(match.group("user"))
+            return f"@{name}" if name else match.group(0)
+        if match.group("channel"):
+            name = channels.get(match.group("channel"))
+            return f"#{name}" if name else match.group(0)
+        name = roles.get(match.group("role"))
+        return f"@{name}" if name else match.group(0)
+
+    return MENTION_PATTERN.sub(replace, text)
@@ -0,0 +1,233 @@
+import time
+import asyncio
+from collections import defaultdict
+from urllib.parse import urlparse
+import redis.exceptions
+from app.utils.logger import logger
+
+# Path segments whose following id is the route's major parameter
+MAJOR_PARAMETERS = {"channels", "guilds", "webhooks"}
+
+ROUTES_KEY = "discord:ratelimit:routes"
+GLOBAL_KEY = "discord:ratelimit:global"
+# Rate limit state expires this long after its last use, or after its reset
+# when that is later
+STATE_TTL = 10 * 60
+
+# Take one request from a bucket and a slot under the global limit. KEYS[1]
+# is the bucket hash (limit, remaining, reset_at), KEYS[2] the global hash
+# (next_slot, reset_at); ARGV holds the time, the spacing between requests
+# under the global limit and the TTL. Returns {"bucket", wait} when the
+# bucket is exhausted, so the caller waits and tries again, otherwise
+# {"slot", wait} with the time to wait for the reserved global slot
+ACQUIRE_SCRIPT = """
+-- Missing hash fields come back as false
+local function number(value)
+    if value then
+        return tonumber(value)
+    end
+end
+
+local now, interval, ttl = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local bucket = redis.call("HMGET", KEYS[1], "limit", "remaining", "reset_at")
+local limit, remaining = number(bucket[1]), number(bucket[2])
+local reset_at = number(bucket[3]) or 0
+if remaining == 0 and reset_at > now then
+    return {"bucket", tostring(reset_at - now)}
+end
+if reset_at <= now then
+    remaining = limit
+end
+if remaining and remaining > 0 then
+    redis.call("HSET", KEYS[1], "remaining", remaining - 1)
+    redis.call("EXPIRE", KEYS[1], ttl)
+end
+
+local state = redis.call("HMGET", KEYS[2], "next_slot", "reset_at")
+local slot = math.max(now, number(state[1]) or 0, number(state[2]) or 0)
+redis.call("HSET", KEYS[2], "next_slot", tostring(slot + interval))
+redis.call("EXPIRE", KEYS[2], ttl)
+return {"slot", tostring(slot - now)}
+"""
+
+# Record a response's rate limit headers for the bucket in KEYS[1]. ARGV
+# holds the time, X-RateLimit-Limit, -Remaining and -Reset-After ("" when
+# missing), the Retry-After of a 429 ("" otherwise), "global" when that 429
+# is global and the TTL. A global 429 pauses every route through KEYS[2].
+# Other workers may have taken requests from the bucket since this response
+# was sent, so within the same window the lower remaining count wins
+UPDATE_SCRIPT = """
+-- Missing hash fields come back as false
+local function number(value)
+    if value then
+        return tonumber(value)
+    end
+end
+
+local now, ttl = tonumber(ARGV[1]), tonumber(ARGV[7])
+local stored = redis.call("HMGET", KEYS[1], "remaining", "reset_at")
+local reset_at = number(stored[2]) or 0
+if ARGV[2] ~= "" then
+    redis.call("HSET", KEYS[1], "limit", ARGV[2])
+end
+if ARGV[3] ~= "" then
+    local remaining = tonumber(ARGV[3])
+    if stored[1] and reset_at > now then
+        remaining = math.min(remaining, tonumber(stored[1]))
+    end
+    redis.call("HSET", KEYS[1], "remaining", remaining)
+end
+if ARGV[4] ~= "" then
+    reset_at = now + tonumber(ARGV[4])
+    redis.call("HSET", KEYS[1], "reset_at", tostring(reset_at))
+end
+if ARGV[5] ~= "" then
+    local until_ = now + tonumber(ARGV[5])
+    if ARGV[6] == "global" then
+        local paused = number(redis.call("HGET", KEYS[2], "reset_at")) or 0
+        redis.call("HSET", KEYS[2], "reset_at", tostring(math.max(paused, until_)))
+        redis.call("EXPIRE", KEYS[2], math.max(ttl, math.ceil(until_ - now) + 1))
+    else
+        reset_at = math.max(reset_at, until_)
+        redis.call("HSET", KEYS[1], "remaining", 0)
+        redis.call("HSET", KEYS[1], "reset_at", tostring(reset_at))
+    end
+end
+redis.call("EXPIRE", KEYS[1], math.max(ttl, math.ceil(reset_at - now) + 1))
+"""
+
+# Route -> X-RateLimit-Bucket, learned from responses and kept for the
+# lifetime of the worker process
+route_buckets = {}
+
+
+class DiscordRateLimiter:
+    """
+    Paces Discord API requests using the X-RateLimit-* response headers. Routes
+    are mapped to the bucket Discord reports for them, and limits are tracked
+    per bucket and major parameter (channel, guild or webhook id), since
+    Discord counts each major parameter separately even when routes share a
+    bucket. Once a bucket has no requests remaining, callers wait until it
+    resets. All requests are also spaced to stay under the global limit, and
+    a global 429 blocks every route for its Retry-After. Time spent waiting
+    is accumulated per bucket.
+
+    Every channel is fetched by its own task, possibly in another worker, so
+    bucket and global state lives in Redis and is updated by Lua scripts that
+    every task shares. What is still per worker: the route -> bucket mapping
+    is read from Redis when a run starts and cached in the process, so a
+    route another worker learns meanwhile counts against a bucket named after
+    the route until this worker sees Discord's bucket header too. Requests
+    already in flight when a bucket runs out still go out, and reset times
+    compare the clocks of the hosts involved. If Redis is
+    unavailable, requests are only paced by the responses' 429s.
+    """
+
+    def __init__(self, redis_client, global_rate=50):
+        self.redis_client = redis_client
+        self.interval = 1 / global_rate
+        self.wait_time = defaultdict(float)
+        self.acquire_script = redis_client.register_script(ACQUIRE_SCRIPT)
+        self.update_script = redis_client.register_script(UPDATE_SCRIPT)
+
+    @staticmethod
+    def route(url):
+        """
+        Return (route, major parameter) for `url`, the route having every id
+        replaced by a placeholder.
+        """
+        parts = urlparse(url).path.split("/")
+        major = None
+        for index, part in enumerate(parts):
+            if part.isdigit():
+                if major is None and parts[index - 1] in MAJOR_PARAMETERS:
+                    major = part
+                parts[index] = "{id}"
+        return "/".join(parts), major
+
+    @staticmethod
+    def bucket_name(route):
+        return route_buckets.get(route, route)
+
+    def bucket_key(self, route, major):
+        return f"discord:ratelimit:bucket:{self.bucket_name(route)}:{major or ''}"
+
+    async def load_routes(self):
+        try:
+            routes = await self.redis_client.hgetall(ROUTES_KEY)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error loading Discord rate limit buckets: {e}")
+            return
+        route_buckets.update(
+            (route.decode("utf-8"), name.decode("utf-8")) for route, name in routes.items()
+        )
+
+    async def acquire(self, url):
+        loop = asyncio.get_running_loop()
+        route, major = self.route(url)
+        started = loop.time()
+        keys = [self.bucket_key(route, major), GLOBAL_KEY]
+
+        while True:
+            try:
+                kind, wait = await self.acquire_script(
+                    keys=keys, args=[time.time(), self.interval, STATE_TTL]
+                )
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Error reading Discord rate limits, not pacing {route}: {e}")
+                break
+            wait = float(wait)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if kind == b"slot":
+                break
+
+        self.wait_time[self.bucket_name(route)] += loop.time() - started
+
+    async def update(self, url, status, headers):
+        route, major = self.route(url)
+        name = headers.get("X-RateLimit-Bucket")
+        retry_after = scope = ""
+        if status == 429:
+            retry_after = headers.get("Retry-After", "1")
+            if headers.get("X-RateLimit-Global"):
+                logger.warning(f"Discord global rate limit hit, pausing {retry_after}s")
+                scope = "global"
+            else:
+                logger.warning(f"Discord rate limit hit on {route}, pausing {retry_after}s")
+        values = [
+            headers.get(header, "")
+            for header in ("X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset-After")
+        ] + [retry_after]
+        try:
+            for value in values:
+                if value:
+                    float(value)
+        except ValueError as e:
+            logger.warning(f"Invalid Discord rate limit headers for {route}: {e}")
+            return
+
+        try:
+            if name and route_buckets.get(route) != name:
+                route_buckets[route] = name
+                await self.redis_client.hset(ROUTES_KEY, route, name)
+            await self.update_script(
+                keys=[self.bucket_key(route, major), GLOBAL_KEY],
+                args=[time.time()] + values + [scope, STATE_TTL],
+            )
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error recording Discord rate limits for {route}: {e}")
+
+    async def flush_metrics(self):
+        if not self.wait_time:
+            return
+        logger.info(
+            "Discord rate limit wait per bucket: "
+            + ", ".join(f"{name}={wait:.2f}s" for name, wait in self.wait_time.items())
+        )
+        try:
+            for name, wait in self.wait_time.items():
+                await self.redis_client.hincrbyfloat("discord:ratelimit:wait_seconds", name, wait)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error recording Discord rate limit metrics: {e}")
+        self.wait_time.clear()
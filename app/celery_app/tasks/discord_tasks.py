@@ -1,46 +1,27 @@
-import json
-import asyncio
 from app.celery_app.celery_instance import app
+from app.celery_app.sources import DISCORD_CHANNELS
 from app.redis.redis_instance import get_redis_client
+from app.redis.dedup import SeenStore
 from .discord import fetch_discord_data
+from .fanout import fan_out, publish_delta, run_source
 
 redis_client = get_redis_client()
+seen_store = SeenStore(redis_client, "discord", "message_id")
 
 
 @app.task
-def broadcast_discord_data():
-    servers = [
-        {
-            "project": "Indiego",
-            "server": "816779565796032513",
-            "channels": ["834798371872047125"],
-        },
-        {
-            "project": "Meld",
-            "server": "850372362033430539",
-            "channels": ["860121140827127848"],
-        },
-        {
-            "project": "Iagon",
-            "server": "837215135999197246",
-            "channels": ["846654998096117791"],
-        },
-        {
-            "project": "Hosky",
-            "server": "903302807346630656",
-            "channels": ["903853505356386384"],
-        },
-        {
-            "project": "Wingriders",
-            "server": "915937361286795334",
-            "channels": ["915937634143043694"],
-        },
-    ]
-    channels = [
-        {"server": server["server"], "channel": channel, "project": server["project"]}
-        for server in servers
-        for channel in server["channels"]
-    ]
-    messages = asyncio.run(fetch_discord_data(channels))
-    message_json = json.dumps(messages)
-    redis_client.publish("notification_channel", message_json)
+def fetch_discord_channel(channel, full_snapshot=False):
+    source_id = f"discord:{channel['channel']}"
+    messages = run_source(
+        source_id, fetch_discord_data([channel], use_cursors=not full_snapshot)
+    )
+    return publish_delta(seen_store, messages, full_snapshot, source_id)
+
+
+@app.task
+def broadcast_discord_data(full_snapshot=False):
+    fan_out(
+        [fetch_discord_channel.s(channel, full_snapshot) for channel in DISCORD_CHANNELS],
+        "discord",
+        full_snapshot,
+    )
@@ -0,0 +1,81 @@
+import asyncio
+from celery import chord
+from app.celery_app.celery_instance import app
+from app.celery_app.runtime import run
+from app.celery_app.scheduler import AdaptiveScheduler
+from app.redis.redis_instance import get_redis_client
+from app.redis.item_store import ItemStore
+from app.redis.transport import publish_notification
+from app.utils.encoding import dumps
+from app.utils.logger import logger
+from .fetcher import SourceUnavailable
+
+redis_client = get_redis_client()
+scheduler = AdaptiveScheduler(redis_client)
+item_store = ItemStore(redis_client)
+
+# Per-source deadline in seconds. A source that has not finished by then
+# contributes nothing to the run, so the aggregate publish is never held back
+SOURCE_DEADLINE = 180
+
+
+def publish_delta(seen_store, items, full_snapshot=False, source_id=None, clusters=None):
+    """
+    Store and publish the new or changed items of one source as soon as they
+    are known and return the per-source result handed to the chord callback.
+    Full snapshots are not published here but returned for the callback to
+    publish as a single message. Regular polls of a scheduled `source_id` feed
+    the number of new items back to the adaptive scheduler, or report a
+    failure when `items` is None. With `clusters`, items are replaced by the
+    canonical items of the stories they belong to.
+    """
+    failed = items is None
+    delta = seen_store.filter_new(items or [], full_snapshot)
+    if source_id and not full_snapshot:
+        if failed:
+            scheduler.record_failure(source_id)
+        else:
+            scheduler.record_poll(source_id, len(delta), [item.timestamp for item in delta])
+    if clusters is not None:
+        delta = clusters.cluster(delta)
+    item_store.save(seen_store.source, delta)
+    if full_snapshot:
+        return {"new": len(delta), "items": [item.to_dict() for item in delta]}
+    if delta:
+        publish_notification(redis_client, dumps(delta), seen_store.source)
+    return {"new": len(delta), "items": []}
+
+
+def run_source(name, coro):
+    """
+    Run a source's coroutine within SOURCE_DEADLINE, returning None when it
+    times out or fails so the rest of the chord still completes and the
+    poll is recorded as failed.
+    """
+    try:
+        return run(coro, timeout=SOURCE_DEADLINE)
+    except asyncio.TimeoutError:
+        logger.error(f"Source {name} missed its {SOURCE_DEADLINE}s deadline")
+    except SourceUnavailable as e:
+        logger.error(f"Source {name} unavailable: {e}")
+    except Exception as e:
+        logger.exception(f"Source {name} failed: {e}")
+    return None
+
+
+@app.task
+def aggregate_results(results, source, full_snapshot=False):
+    new_items = sum(result["new"] for result in results)
+    logger.info(f"{source}: {len(results)} sources finished, {new_items} new items")
+    if full_snapshot:
+        items = [item for result in results for item in result["items"]]
+        if items:
+            publish_notification(redis_client, dumps(items), source)
+
+
+def fan_out(signatures, source, full_snapshot=False):
+    """
+    Run one task per source in parallel across the workers, then aggregate
+    their results once all of them have returned.
+    """
+    return chord(signatures)(aggregate_results.s(source, full_snapshot))
@@ -0,0 +1,88 @@
+import hashlib
+from collections import Counter, defaultdict
+from app.utils.logger import logger
+
+FEED_CACHE_TTL = 7 * 24 * 60 * 60
+
+
+class FeedCache:
+    """
+    Per-feed HTTP validators (ETag / Last-Modified) and body digest stored in
+    Redis, so unchanged feeds can be skipped before they are parsed. Entries
+    are loaded for all feeds in one pipeline before a run and written back in
+    one pipeline afterwards, together with per-feed hit/miss counters. Uses
+    the asyncio Redis client so it never blocks the worker's event loop.
+    """
+
+    def __init__(self, redis_client, ttl=FEED_CACHE_TTL):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.entries = {}
+        self.updates = {}
+        self.stats = defaultdict(Counter)
+
+    @staticmethod
+    def key(url):
+        return f"feed_cache:{url}"
+
+    @staticmethod
+    def stats_key(url):
+        return f"feed_cache:stats:{url}"
+
+    async def load(self, urls):
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for url in urls:
+                pipe.hgetall(self.key(url))
+            results = await pipe.execute()
+        for url, entry in zip(urls, results):
+            self.entries[url] = {
+                field.decode("utf-8"): value.decode("utf-8")
+                for field, value in entry.items()
+            }
+
+    def conditional_headers(self, url):
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def not_modified(self, url):
+        self.stats[url]["not_modified"] += 1
+        self.stats[url]["bytes_saved"] += int(self.entries.get(url, {}).get("length", 0))
+
+    def is_unchanged(self, url, response_headers, body):
+        """
+        Record the validators and digest of a freshly downloaded feed and
+        return True if the body is identical to the previous download.
+        """
+        digest = hashlib.sha1(body).hexdigest()
+        unchanged = self.entries.get(url, {}).get("digest") == digest
+        self.updates[url] = {
+            "etag": response_headers.get("ETag", ""),
+            "last_modified": response_headers.get("Last-Modified", ""),
+            "digest": digest,
+            "length": len(body),
+        }
+        self.stats[url]["unchanged" if unchanged else "miss"] += 1
+        return unchanged
+
+    async def save(self):
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for url, mapping in self.updates.items():
+                pipe.hset(self.key(url), mapping=mapping)
+                pipe.expire(self.key(url), self.ttl)
+            for url, counts in self.stats.items():
+                for field, amount in counts.items():
+                    pipe.hincrby(self.stats_key(url), field, amount)
+            await pipe.execute()
+
+        totals = sum(self.stats.values(), Counter())
+        logger.info(
+            f"Feed cache: {totals['not_modified']} not modified, {totals['unchanged']} unchanged, "
+            f"{totals['miss']} changed, {totals['bytes_saved']} bytes saved"
+        )
+        self.updates.clear()
+        self.stats.clear()
@@ -0,0 +1,197 @@
+import time
+import random
+import asyncio
+import aiohttp
+from collections import namedtuple
+from urllib.parse import urlparse
+from app.utils.logger import logger
+
+FetchResponse = namedtuple("FetchResponse", ["status", "headers", "body"])
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SourceUnavailable(Exception):
+    """
+    Raised by a source when none of its requests succeeded, so the poll
+    counts as failed rather than as one that found nothing new.
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects requests
+    for `cooldown` seconds. After the cool-down the breaker is half-open and
+    lets a single trial request through; a success closes the breaker, a
+    failure opens it again. A trial that never reports back is followed by
+    another one a cool-down later.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=300):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.half_open = False
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.cooldown:
+            return False
+        # Restart the cool-down so only this caller gets the trial request
+        self.opened_at = now
+        self.half_open = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.half_open = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.half_open or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.half_open = False
+
+
+# Breakers outlive a single task run so a dead host stays skipped across runs
+breakers = {}
+
+
+def get_breaker(host):
+    if host not in breakers:
+        breakers[host] = CircuitBreaker()
+    return breakers[host]
+
+
+class Fetcher:
+    """
+    Shared async HTTP fetch layer used by the news, Discord and YouTube
+    sources. Every request gets a per-request timeout clipped to the overall
+    deadline of the run, failures are retried with jittered exponential
+    backoff (or the server's Retry-After), concurrency is capped per host and
+    hosts that keep failing are skipped by their circuit breaker. An optional
+    `limiter` is awaited before each request and fed each response's headers.
+    """
+
+    def __init__(
+        self,
+        session=None,
+        total_timeout=120,
+        request_timeout=20,
+        retries=3,
+        base_delay=1,
+        max_delay=30,
+        per_host_limit=4,
+        limiter=None,
+    ):
+        self.session = session
+        self.owns_session = session is None
+        self.total_timeout = total_timeout
+        self.request_timeout = request_timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.per_host_limit = per_host_limit
+        self.limiter = limiter
+        self.semaphores = {}
+        self.deadline = None
+
+    async def __aenter__(self):
+        if self.owns_session:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+        self.deadline = asyncio.get_running_loop().time() + self.total_timeout
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.owns_session:
+            await self.session.close()
+
+    def remaining(self):
+        return self.deadline - asyncio.get_running_loop().time()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def semaphore(self, host):
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self.semaphores[host]
+
+    @staticmethod
+    def retry_after(response):
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    async def read_body(response, read):
+        if read == "json":
+            return await response.json(content_type=None)
+        if read == "text":
+            return await response.text()
+        return await response.read()
+
+    async def fetch(self, url, headers=None, params=None, ok_statuses=(200,), read="json"):
+        """
+        GET `url` and return a FetchResponse whose body is decoded according to
+        `read` ("json", "text" or "read" for raw bytes), or None if the request
+        did not succeed within the retry budget and deadline.
+        """
+        host = urlparse(url).hostname
+        breaker = get_breaker(host)
+
+        for attempt in range(self.retries):
+            if not breaker.allow():
+                logger.warning(f"Circuit open for {host}, skipping: {url}")
+                return None
+            delay = None
+            try:
+                async with self.semaphore(host):
+                    if self.limiter:
+                        await self.limiter.acquire(url)
+                    remaining = self.remaining()
+                    if remaining <= 0:
+                        logger.error(f"Deadline exceeded before fetching: {url}")
+                        return None
+                    timeout = aiohttp.ClientTimeout(
+                        total=min(self.request_timeout, remaining)
+                    )
+                    async with self.session.get(
+                        url, headers=headers, params=params, timeout=timeout
+                    ) as response:
+                        if self.limiter:
+                            await self.limiter.update(url, response.status, response.headers)
+                        if response.status in ok_statuses:
+                            body = await self.read_body(response, read)
+                            breaker.record_success()
+                            return FetchResponse(response.status, response.headers, body)
+
+                        logger.warning(
+                            f"Request failed (status code {response.status}): {url}"
+                        )
+                        if response.status not in RETRY_STATUSES:
+                            return None
+                        if response.status == 429:
+                            delay = self.retry_after(response)
+                        else:
+                            breaker.record_failure()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error fetching: {url}, error: {e!r}")
+                breaker.record_failure()
+
+            if attempt < self.retries - 1:
+                if delay is None:
+                    delay = self.backoff(attempt)
+                delay = min(delay, max(self.remaining(), 0))
+                logger.info(f"Retrying {url} in {delay:.1f} seconds...")
+                await asyncio.sleep(delay)
+
+        logger.error(f"Failed to fetch after {self.retries} attempts: {url}")
+        return None
@@ -0,0 +1,65 @@
+import re
+from functools import lru_cache
+
+
+def trie_pattern(words):
+    """
+    Build a regex alternation for `words` with common prefixes factored out,
+    e.g. ["ada", "adam", "iog", "iohk"] -> "(?:ada(?:m)?|io(?:g|hk))". The re module
+    does not optimise plain alternations of literals, so this keeps matching
+    close to a single pass over the text however many keywords there are.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if "" in node:
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Whole-word, case-insensitive matcher for a fixed set of keywords, compiled
+    once into a single prefix-factored regex. Longer keywords win over their
+    prefixes, so the reported hit is the most specific one at each position.
+    A matcher without keywords matches nothing.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = frozenset(keyword.lower() for keyword in keywords if keyword)
+        self.pattern = None
+        if self.keywords:
+            self.pattern = re.compile(r"\b(?:" + trie_pattern(self.keywords) + r")\b")
+
+    def matches(self, *texts):
+        """
+        Return the set of keywords found in any of the given texts.
+        """
+        hits = set()
+        if self.pattern is None:
+            return hits
+        for text in texts:
+            if text:
+                hits.update(self.pattern.findall(text.lower()))
+        return hits
+
+
+@lru_cache(maxsize=32)
+def compile_matcher(keywords):
+    return KeywordMatcher(keywords)
+
+
+def get_matcher(keywords):
+    return compile_matcher(tuple(keywords))
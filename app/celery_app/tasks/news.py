@@ -1,37 +1,33 @@
-import re
-import time
-import aiohttp
 import asyncio
-import feedparser
-from datetime import datetime
 from urllib.parse import urlparse
 from app.utils.logger import logger
+from app.utils.records import Article, entry_timestamp
+from app.celery_app.runtime import async_redis, http_session
+from .feed_cache import FeedCache
+from .fetcher import Fetcher, SourceUnavailable
+from .matcher import get_matcher
+from .parser_pool import parse_feed
 
 
-async def download_feed(session, url, retries=3, delay=5):
+async def download_feed(fetcher, url, feed_cache=None):
     headers = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
     }
-
-    for attempt in range(retries):
-        try:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    return feedparser.parse(content)
-                else:
-                    logger.warning(
-                        f"Failed to download feed (status code {response.status}): {url}"
-                    )
-        except aiohttp.ClientError as e:
-            logger.error(f"Error downloading feed: {url}, error: {e}")
-
-        if attempt < retries - 1:
-            logger.info(f"Retrying in {delay} seconds...")
-            time.sleep(delay)
-
-    logger.error(f"Failed to download feed after {retries} attempts: {url}")
-    return None
+    if feed_cache:
+        headers.update(feed_cache.conditional_headers(url))
+
+    response = await fetcher.fetch(
+        url, headers=headers, ok_statuses=(200, 304), read="read"
+    )
+    if response is None:
+        raise SourceUnavailable(url)
+    if response.status == 304:
+        if feed_cache:
+            feed_cache.not_modified(url)
+        return None
+    if feed_cache and feed_cache.is_unchanged(url, response.headers, response.body):
+        return None
+    return await parse_feed(response.body)
 
 
 def extract_author(entry):
@@ -53,17 +49,6 @@ def extract_image(entry):
     return "no_image"
 
 
-def extract_published(entry):
-    try:
-        published = entry.get("published", "")
-        date_object = datetime.strptime(published, "%a, %d %b %Y %H:%M:%S %z")
-        timestamp = int(date_object.timestamp())
-        return timestamp
-    except Exception as e:
-        logger.error(f"Error extracting published: {e}")
-    return "No published date found"
-
-
 def process_entry(entry, keywords=None):
     try:
         link = entry.get("link", "")
@@ -71,23 +56,24 @@ def process_entry(entry, keywords=None):
         hostname_parts = parsed_url.hostname.split(".")
         organization = ".".join(hostname_parts[-2:])
 
-        article = {
-            "organization": organization,
-            "title": entry.get("title", ""),
-            "link": link,
-            "description": entry.get("description", ""),
-            "published": extract_published(entry),
-            "author": extract_author(entry),
-            "image": extract_image(entry),
-        }
+        article = Article(
+            organization=organization,
+            title=entry.get("title", ""),
+            link=link,
+            description=entry.get("description", ""),
+            published=entry_timestamp(entry),
+            author=extract_author(entry),
+            image=extract_image(entry),
+            keywords=[],
+            story_id=None,
+            alternates=[],
+        )
 
         # Check if any of the keywords are present in the title or description as whole words
         if keywords:
-            if any(
-                re.search(r"\b" + re.escape(keyword.lower()) + r"\b", article["title"].lower())
-                or re.search(r"\b" + re.escape(keyword.lower()) + r"\b", article["description"].lower())
-                for keyword in keywords
-            ):
+            hits = get_matcher(keywords).matches(article.title, article.description)
+            if hits:
+                article.keywords = sorted(hits)
                 return article
             else:
                 return None
@@ -98,10 +84,10 @@ def process_entry(entry, keywords=None):
         return None
 
 
-async def process_feed_entries(feed, keywords=None):
+async def process_feed_entries(entries, keywords=None):
     articles = []
     try:
-        for entry in feed.entries:
+        for entry in entries:
             article = process_entry(entry, keywords)
             if article:
                 articles.append(article)
@@ -110,20 +96,40 @@ async def process_feed_entries(feed, keywords=None):
     return articles
 
 
-async def fetch_news_data(feed_urls, keywords=None):
-    async with aiohttp.ClientSession() as session:
+async def fetch_news_data(feed_urls, keywords=None, use_cache=False):
+    """
+    Download the feeds and return the matching articles. Feeds are parsed in
+    the parser pool and their entries processed as soon as each one finishes.
+    With `use_cache`, feeds that are unchanged since the previous run are
+    skipped entirely. Raises SourceUnavailable if no feed could be downloaded.
+    """
+    async with async_redis() as redis_client, Fetcher(session=http_session()) as fetcher:
         try:
-            feeds = await asyncio.gather(
-                *(download_feed(session, url) for url in feed_urls)
-            )
-
+            feed_cache = FeedCache(redis_client) if use_cache else None
+            if feed_cache:
+                await feed_cache.load(feed_urls)
+            downloads = [
+                download_feed(fetcher, url, feed_cache=feed_cache) for url in feed_urls
+            ]
             all_articles = []
-            for feed in feeds:
-                if feed is not None:
-                    articles = await process_feed_entries(feed, keywords)
+            failed = 0
+            for next_feed in asyncio.as_completed(downloads):
+                try:
+                    entries = await next_feed
+                except SourceUnavailable:
+                    failed += 1
+                    continue
+                if entries is not None:
+                    articles = await process_feed_entries(entries, keywords)
                     all_articles.extend(articles)
 
+            if feed_cache:
+                await feed_cache.save()
+            if feed_urls and failed == len(feed_urls):
+                raise SourceUnavailable(", ".join(feed_urls))
             return all_articles
+        except SourceUnavailable:
+            raise
         except Exception as e:
             logger.exception(f"Error in fetch_news_data function: {e}")
             return []
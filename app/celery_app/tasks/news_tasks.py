@@ -1,42 +1,34 @@
-import json
-import asyncio
 from app.celery_app.celery_instance import app
+from app.celery_app.sources import NEWS_FEEDS
 from app.redis.redis_instance import get_redis_client
+from app.redis.dedup import SeenStore
 from .news import fetch_news_data
+from .story_clusters import StoryClusters
+from .fanout import fan_out, publish_delta, run_source
 
 redis_client = get_redis_client()
+seen_store = SeenStore(redis_client, "news", "link")
+story_clusters = StoryClusters(redis_client)
 
 
 @app.task
-def broadcast_news_data():
-    cardano_feed_urls = [
-        "https://newsbtc.com/analysis/ada/feed/",
-        "https://newsbtc.com/news/cardano/feed/",
-        "https://cointelegraph.com/rss/tag/cardano/",
-        "https://cryptoslate.com/news/cardano/feed/",
-        "https://dailycoin.com/cardano-ada/feed/",
-        "https://zycrypto.com/tag/cardano/feed/",
-        "https://zycrypto.com/tag/adausd/feed/",
-        "https://zycrypto.com/tag/ada/feed/",
-        "https://watcher.guru/news/category/cardano/feed/",
-    ]
-    generic_feed_urls = [
-        "https://coindesk.com/arc/outboundfeeds/rss/",
-        "https://cryptonews.com/news/feed/",
-        "https://beincrypto.com/feed/",
-        "https://crypto.news/feed/",
-        "https://bitcoinist.com/feed/",
-        "https://cryptopotato.com/feed/",
-        "https://cryptobriefing.com/feed/",
-        "https://dailyhodl.com/feed/",
-        "https://news.bitcoin.com/feed/",
-        "https://forkast.news/feed/",
-        "https://ambcrypto.com/feed/",
-        "https://cryptoglobe.com/rss/feed.xml",
-    ]
-    cardano_keywords = ["cardano", "hoskinson", "ada", "iohk", "iog", "$ada"]
-    cardano_feeds = asyncio.run(fetch_news_data(cardano_feed_urls, []))
-    generic_feeds = asyncio.run(fetch_news_data(generic_feed_urls, cardano_keywords))
-    combined_articles = cardano_feeds + generic_feeds
-    message_json = json.dumps(combined_articles)
-    redis_client.publish("notification_channel", message_json)
+def fetch_news_feed(feed_url, keywords, full_snapshot=False):
+    # A full snapshot has to see every entry, so it bypasses the feed cache
+    articles = run_source(
+        feed_url, fetch_news_data([feed_url], keywords, use_cache=not full_snapshot)
+    )
+    return publish_delta(
+        seen_store, articles, full_snapshot, f"news:{feed_url}", story_clusters
+    )
+
+
+@app.task
+def broadcast_news_data(full_snapshot=False):
+    fan_out(
+        [
+            fetch_news_feed.s(feed_url, keywords, full_snapshot)
+            for feed_url, keywords in NEWS_FEEDS
+        ],
+        "news",
+        full_snapshot,
+    )
@@ -0,0 +1,61 @@
+import os
+import asyncio
+import billiard
+import feedparser
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+# 0 parses inline on the event loop, as before the pool existed
+FEED_PARSER_POOL_SIZE = int(
+    os.environ.get("FEED_PARSER_POOL_SIZE", os.cpu_count() or 1)
+)
+# "process" or "thread"
+FEED_PARSER_POOL_KIND = os.environ.get("FEED_PARSER_POOL_KIND", "process")
+
+executor = None
+
+
+class ProcessPool(Executor):
+    """
+    Executor over a billiard process pool. Celery prefork children are
+    daemonic, and multiprocessing (so ProcessPoolExecutor) refuses to start
+    processes from a daemonic one; billiard, Celery's own fork of
+    multiprocessing, allows it.
+    """
+
+    def __init__(self, max_workers):
+        self.pool = billiard.Pool(max_workers)
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.pool.apply_async(
+            fn, args, kwargs, callback=future.set_result, error_callback=future.set_exception
+        )
+        return future
+
+    def shutdown(self, wait=True, **kwargs):
+        self.pool.close()
+        if wait:
+            self.pool.join()
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        if FEED_PARSER_POOL_KIND == "process":
+            executor = ProcessPool(FEED_PARSER_POOL_SIZE)
+        else:
+            executor = ThreadPoolExecutor(max_workers=FEED_PARSER_POOL_SIZE)
+    return executor
+
+
+def parse_entries(content):
+    # Only the entries cross the process boundary; the rest of the parse
+    # result (e.g. bozo_exception) is not needed and not always picklable
+    return feedparser.parse(content).entries
+
+
+async def parse_feed(content):
+    if FEED_PARSER_POOL_SIZE <= 0:
+        return parse_entries(content)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), parse_entries, content)
@@ -0,0 +1,35 @@
+from app.celery_app.celery_instance import app
+from app.celery_app.sources import NEWS_FEEDS, DISCORD_CHANNELS, YOUTUBE_KEYWORDS
+from app.celery_app.scheduler import AdaptiveScheduler
+from app.redis.redis_instance import get_redis_client
+from app.utils.logger import logger
+from .news_tasks import fetch_news_feed
+from .discord_tasks import fetch_discord_channel
+from .youtube_tasks import fetch_youtube_videos
+
+redis_client = get_redis_client()
+scheduler = AdaptiveScheduler(redis_client)
+
+
+def scheduled_sources():
+    """
+    Map every configured source id to the task signature that polls it.
+    """
+    sources = {}
+    for feed_url, keywords in NEWS_FEEDS:
+        sources[f"news:{feed_url}"] = fetch_news_feed.s(feed_url, keywords)
+    for channel in DISCORD_CHANNELS:
+        sources[f"discord:{channel['channel']}"] = fetch_discord_channel.s(channel)
+    sources["youtube"] = fetch_youtube_videos.s(YOUTUBE_KEYWORDS)
+    return sources
+
+
+@app.task
+def dispatch_due_sources():
+    sources = scheduled_sources()
+    scheduler.register(sources)
+    due = scheduler.claim_due(sources)
+    for source_id in due:
+        sources[source_id].delay()
+    if due:
+        logger.info(f"Dispatched {len(due)} due sources: {', '.join(due)}")
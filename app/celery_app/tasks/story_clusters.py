@@ -0,0 +1,247 @@
+import re
+import time
+import hashlib
+from app.redis.dedup import stable_hash
+from app.utils.encoding import dumps, loads
+from app.utils.logger import logger
+from app.utils.records import Article
+
+FINGERPRINT_BITS = 64
+# Articles whose fingerprints differ in at most this many bits are one story;
+# unrelated articles are typically 18 or more bits apart. With BANDS greater
+# than MAX_DISTANCE two such fingerprints agree exactly on at least one band,
+# so looking up the article's own bands finds every candidate
+MAX_DISTANCE = 7
+BANDS = 8
+BAND_BITS = FINGERPRINT_BITS // BANDS
+STORY_TTL = 3 * 24 * 60 * 60
+# Newest index entries compared per band. Rewrites of a story appear within
+# hours, so this bounds the cost of a lookup however many articles are
+# indexed while only missing matches against old, busy bands
+BAND_CANDIDATES = 32
+
+# Assign one article to a story. KEYS[1] records the article's story,
+# KEYS[2..] are its band indexes: sorted sets of "<high>:<low>:<story id>"
+# fingerprint halves scored by insert time. ARGV holds the fingerprint's high
+# and low 32 bits, the id of the story the article would start, the time, the
+# TTL, the maximum distance and the entries read per band. Matching and
+# indexing happen in one step, so articles reporting the same story at the
+# same time cannot start two stories. Returns the story id and whether the
+# article was "seen" before, starts a "new" story or "joined" one
+ASSIGN_SCRIPT = """
+local assigned = redis.call("GET", KEYS[1])
+if assigned then
+    return {assigned, "seen"}
+end
+local high, low = tonumber(ARGV[1]), tonumber(ARGV[2])
+local now, ttl = tonumber(ARGV[4]), tonumber(ARGV[5])
+local max_distance, per_band = tonumber(ARGV[6]), tonumber(ARGV[7])
+
+-- Bits that differ between two 32-bit numbers, in plain arithmetic since
+-- Lua numbers are doubles
+local function gap32(a, b)
+    local count = 0
+    for _ = 1, 32 do
+        if a % 2 ~= b % 2 then
+            count = count + 1
+        end
+        a, b = math.floor(a / 2), math.floor(b / 2)
+    end
+    return count
+end
+
+local story, best = ARGV[3], max_distance + 1
+for index = 2, #KEYS do
+    local members = redis.call(
+        "ZREVRANGEBYSCORE", KEYS[index], "+inf", now - ttl, "LIMIT", 0, per_band
+    )
+    for _, member in ipairs(members) do
+        local other_high, other_low, other_story = string.match(member, "^(%d+):(%d+):(.+)$")
+        local gap = gap32(high, tonumber(other_high)) + gap32(low, tonumber(other_low))
+        if gap < best then
+            best, story = gap, other_story
+        end
+    end
+end
+
+local member = ARGV[1] .. ":" .. ARGV[2] .. ":" .. story
+for index = 2, #KEYS do
+    redis.call("ZADD", KEYS[index], now, member)
+    redis.call("ZREMRANGEBYSCORE", KEYS[index], "-inf", now - ttl)
+    redis.call("EXPIRE", KEYS[index], ttl)
+end
+redis.call("SET", KEYS[1], story, "EX", ttl)
+if best > max_distance then
+    return {story, "new"}
+end
+return {story, "joined"}
+"""
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+
+
+def normalize(text):
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(TAG_PATTERN.sub(" ", text or "").lower())
+        if token not in STOPWORDS
+    ]
+
+
+def features(article):
+    """
+    Weighted words of an article; title words count double.
+    """
+    weights = {}
+    for tokens, weight in ((normalize(article.title), 2), (normalize(article.description), 1)):
+        for token in tokens:
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def simhash(weights):
+    # Bit i of the fingerprint is set when the features whose hash has bit i
+    # set outweigh those whose hash does not
+    ones = [0] * FINGERPRINT_BITS
+    for feature, weight in weights.items():
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        bits = format(int.from_bytes(digest, "big"), "064b")
+        for index, bit in enumerate(bits):
+            if bit == "1":
+                ones[index] += weight
+    half = sum(weights.values()) / 2
+    return int("".join("1" if total > half else "0" for total in ones), 2)
+
+
+def bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (band * BAND_BITS) & mask for band in range(BANDS)]
+
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class StoryClusters:
+    """
+    Groups news articles that tell the same story into clusters using SimHash
+    fingerprints of their normalized title and description. Fingerprints are
+    indexed in Redis by band (LSH), each entry expiring on its own, and an
+    article is compared with the newest BAND_CANDIDATES entries of each of
+    its bands, so a lookup costs the same however many articles are indexed.
+    A cluster keeps its first article as the canonical one and lists the
+    others as alternates; only the canonical article, with its alternates,
+    is published and stored.
+
+    Feeds are fetched in parallel, so every update is safe against
+    concurrent tasks: articles are assigned to stories by a Lua script, and
+    each story is a hash with one field for the canonical article and one per
+    alternate, written and read back in a single transaction.
+    """
+
+    def __init__(self, redis_client, max_distance=MAX_DISTANCE, ttl=STORY_TTL):
+        self.redis_client = redis_client
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.assign_script = redis_client.register_script(ASSIGN_SCRIPT)
+
+    @staticmethod
+    def band_key(band, value):
+        return f"story:lsh:{band}:{value}"
+
+    @staticmethod
+    def member_key(link):
+        return f"story:article:{stable_hash(link)}"
+
+    @staticmethod
+    def story_key(story_id):
+        return f"story:{story_id}"
+
+    @staticmethod
+    def own_story_id(article):
+        # The id of the story an article starts, so its canonical article is
+        # known without a lookup
+        return stable_hash(article.link)[:16]
+
+    @staticmethod
+    def alternate(article):
+        return {
+            "organization": article.organization,
+            "title": article.title,
+            "link": article.link,
+            "published": article.published,
+        }
+
+    def assign(self, articles, now):
+        """
+        Return a (story id, status) pair per article, see ASSIGN_SCRIPT.
+        """
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for article in articles:
+                fingerprint = simhash(features(article))
+                keys = [self.member_key(article.link)] + [
+                    self.band_key(band, value) for band, value in enumerate(bands(fingerprint))
+                ]
+                args = [
+                    fingerprint >> 32,
+                    fingerprint & 0xFFFFFFFF,
+                    self.own_story_id(article),
+                    now,
+                    self.ttl,
+                    self.max_distance,
+                    BAND_CANDIDATES,
+                ]
+                self.assign_script(keys=keys, args=args, client=pipe)
+            replies = pipe.execute()
+        return [(story_id.decode("utf-8"), status.decode("utf-8")) for story_id, status in replies]
+
+    def cluster(self, articles):
+        """
+        Assign `articles` to stories and return the canonical articles of the
+        stories they touched, with their alternates filled in. A story whose
+        canonical article has not been stored yet is left out; the task
+        storing it reads this article back as an alternate.
+        """
+        if not articles:
+            return []
+        now = time.time()
+        touched = []
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            for article, (story_id, status) in zip(articles, self.assign(articles, now)):
+                key = self.story_key(story_id)
+                if story_id == self.own_story_id(article):
+                    # A new story, or an update of its canonical article
+                    article.story_id = story_id
+                    article.alternates = []
+                    pipe.hset(key, "canonical", dumps(article))
+                else:
+                    field = f"alternate:{stable_hash(article.link)}"
+                    pipe.hset(key, field, dumps(self.alternate(article)))
+                pipe.hset(key, "updated", now)
+                pipe.expire(key, self.ttl)
+                if story_id not in touched:
+                    touched.append(story_id)
+                if status != "seen":
+                    logger.info(
+                        f"Article {article.link} {'starts' if status == 'new' else 'joins'} story {story_id}"
+                    )
+            for story_id in touched:
+                pipe.hgetall(self.story_key(story_id))
+            stories = pipe.execute()[-len(touched) :]
+
+        canonicals = []
+        for story_id, story in zip(touched, stories):
+            if b"canonical" not in story:
+                continue
+            canonical = loads(story[b"canonical"])
+            canonical["story_id"] = story_id
+            canonical["alternates"] = sorted(
+                (loads(value) for field, value in story.items() if field.startswith(b"alternate:")),
+                key=lambda alternate: (alternate["published"] or 0, alternate["link"]),
+            )
+            canonicals.append(Article(**canonical))
+        return canonicals
@@ -1,118 +1,210 @@
 import os
+import time
 import asyncio
-import aiohttp
 from dotenv import load_dotenv
-from contextlib import asynccontextmanager
-from typing import List, Dict, Any
+from typing import List, Optional
 from app.utils.logger import logger
+from app.utils.records import Video, iso_timestamp
+from app.celery_app.runtime import async_redis, http_session
+from .fetcher import Fetcher
+from .youtube_quota import QuotaBudget, SearchCache
 
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
-
-@asynccontextmanager
-async def create_session() -> aiohttp.ClientSession:
-    session = aiohttp.ClientSession()
-    try:
-        yield session
-    finally:
-        await session.close()
+# videos.list accepts at most 50 ids per request
+VIDEOS_PER_REQUEST = 50
 
 
 async def search_videos(
-    keyword: str, event_type: str, max_results: int, order: str
-) -> List[str]:
+    fetcher: Fetcher,
+    keyword: str,
+    event_type: str,
+    max_results: int,
+    order: str,
+    published_after: Optional[str] = None,
+) -> Optional[List[str]]:
     """
     Search for videos on YouTube based on the provided parameters.
+    :param fetcher: The shared fetcher used for the request.
     :param keyword: The search keyword.
     :param event_type: The event type to filter the search results.
     :param max_results: The maximum number of results to retrieve.
     :param order: The order of the search results.
-    :return: A list of video IDs matching the search criteria.
+    :param published_after: Only return videos published after this RFC 3339 time.
+    :return: A list of video IDs matching the search criteria, None on failure.
     """
     try:
-        async with create_session() as session:
-            url = "https://www.googleapis.com/youtube/v3/search"
-            params = {
-                "q": keyword,
-                "type": "video",
-                "eventType": event_type,
-                "part": "id,snippet",
-                "maxResults": max_results,
-                "order": order,
-                "key": YOUTUBE_API_KEY,
-            }
-            async with session.get(url, params=params) as response:
-                search_response = await response.json()
-                videos = [
-                    search_result["id"]["videoId"]
-                    for search_result in search_response.get("items", [])
-                ]
-                return videos
+        url = "https://www.googleapis.com/youtube/v3/search"
+        params = {
+            "q": keyword,
+            "type": "video",
+            "eventType": event_type,
+            "part": "id,snippet",
+            "maxResults": max_results,
+            "order": order,
+            "key": YOUTUBE_API_KEY,
+        }
+        if published_after:
+            params["publishedAfter"] = published_after
+        response = await fetcher.fetch(url, params=params)
+        if response is None:
+            return None
+        videos = [
+            search_result["id"]["videoId"]
+            for search_result in response.body.get("items", [])
+        ]
+        return videos
     except Exception as e:
         logger.error(f"An error occurred during video search: {str(e)}")
-        return []
+        return None
 
 
-async def get_video_data(video_results: List[str]) -> List[Dict[str, Any]]:
+async def cached_search(
+    fetcher: Fetcher,
+    budget: QuotaBudget,
+    cache: SearchCache,
+    keyword: str,
+    event_type: str,
+    max_results: int,
+    order: str,
+    interval: float,
+) -> List[str]:
     """
-    Retrieve detailed information for the given video IDs.
+    Search through the search cache. The API is only called once the cached
+    result is older than `interval` and the budget allows it, and then only
+    for videos published after the cached watermark.
+    :return: A list of video IDs, the cached ones when no search was made.
+    """
+    entry = await cache.get(keyword, event_type, order)
+    cached_ids = entry["video_ids"] if entry else []
+    if SearchCache.is_fresh(entry, interval):
+        return cached_ids
+    if not budget.can_afford("search"):
+        logger.warning(f"YouTube quota budget exhausted, skipping search for {keyword}")
+        return cached_ids
+
+    searched_at = time.time()
+    video_ids = await search_videos(
+        fetcher,
+        keyword,
+        event_type,
+        max_results,
+        order,
+        published_after=entry["published_after"] if entry else None,
+    )
+    if video_ids is None:
+        return cached_ids
+    # Keep the previous results when nothing new has been published since
+    await cache.set(keyword, event_type, order, video_ids or cached_ids, searched_at)
+    return video_ids
+
+
+async def get_video_data(
+    fetcher: Fetcher, video_results: List[str]
+) -> List[Video]:
+    """
+    Retrieve detailed information for the given video IDs, batching them into
+    as few videos.list requests as the API allows.
+    :param fetcher: The shared fetcher used for the requests.
     :param video_results: A list of video IDs.
-    :return: A list of dictionaries containing video data.
+    :return: A list of Video records for the videos that could be loaded.
     """
-    video_data = []
-    async with create_session() as session:
-        tasks = []
-        for video_id in video_results:
-            task = asyncio.ensure_future(fetch_video_data(session, video_id))
-            tasks.append(task)
-        video_data = await asyncio.gather(*tasks)
-    return video_data
+    batches = [
+        video_results[index : index + VIDEOS_PER_REQUEST]
+        for index in range(0, len(video_results), VIDEOS_PER_REQUEST)
+    ]
+    results = await asyncio.gather(
+        *(fetch_video_data(fetcher, batch) for batch in batches)
+    )
+    return [video for videos in results for video in videos]
 
 
-async def fetch_video_data(
-    session: aiohttp.ClientSession, video_id: str
-) -> Dict[str, Any]:
+async def fetch_video_data(fetcher: Fetcher, video_ids: List[str]) -> List[Video]:
+    """
+    Load up to VIDEOS_PER_REQUEST videos with a single videos.list call.
+    :param fetcher: The shared fetcher used for the request.
+    :param video_ids: The video IDs to load.
+    :return: A list of Video records, in the order the API returned them.
+    """
     try:
         url = "https://www.googleapis.com/youtube/v3/videos"
         params = {
             "part": "snippet",
-            "id": video_id,
+            "id": ",".join(video_ids),
+            "maxResults": len(video_ids),
             "key": YOUTUBE_API_KEY,
         }
-        async with session.get(url, params=params) as response:
-            video_response = await response.json()
-            if video_response["items"]:
-                item = video_response["items"][0]
-                return {
-                    "id": item["id"],
-                    "title": item["snippet"]["title"],
-                    "full_description": item["snippet"]["description"],
-                    "channel_title": item["snippet"]["channelTitle"],
-                    "published_at": item["snippet"]["publishedAt"],
-                    "urls": {
-                        "channel": f"https://www.youtube.com/@{item['snippet']['channelTitle']}",
-                        "video": f"https://www.youtube.com/watch?v={item['id']}",
-                    },
-                }
-            else:
-                logger.warning(f"Video with ID {video_id} not found.")
+        response = await fetcher.fetch(url, params=params)
+        if response is None:
+            return []
+        videos = [
+            Video(
+                id=item["id"],
+                title=item["snippet"]["title"],
+                full_description=item["snippet"]["description"],
+                channel_title=item["snippet"]["channelTitle"],
+                published_at=item["snippet"]["publishedAt"],
+                published=iso_timestamp(item["snippet"]["publishedAt"]),
+                urls={
+                    "channel": f"https://www.youtube.com/@{item['snippet']['channelTitle']}",
+                    "video": f"https://www.youtube.com/watch?v={item['id']}",
+                },
+            )
+            for item in response.body.get("items", [])
+        ]
+        missing = set(video_ids) - {video.id for video in videos}
+        if missing:
+            logger.warning(f"Videos with IDs {', '.join(sorted(missing))} not found.")
+        return videos
     except Exception as e:
         logger.error(
-            f"An error occurred while retrieving video data for ID {video_id}: {str(e)}"
+            f"An error occurred while retrieving video data for IDs {video_ids}: {str(e)}"
         )
+        return []
 
 
-async def fetch_youtube_data(keywords, max_results) -> List[Dict[str, Any]]:
+async def fetch_youtube_data(keywords, max_results, use_cache=True) -> List[Video]:
+    """
+    Search every keyword and load the details of the videos found. With
+    `use_cache`, searches go through the search cache and are spaced out to
+    fit the daily quota budget; otherwise every keyword is searched afresh.
+    """
     event_type = "completed"
     order = "date"
-    all_videos = []
-    for keyword in keywords:
-        videos = await search_videos(keyword, event_type, max_results, order)
-        videos_data = await get_video_data(videos)
-        all_videos.extend(videos_data)
-    return all_videos
-
+    async with async_redis() as redis_client:
+        budget = QuotaBudget(redis_client)
+        cache = SearchCache(redis_client)
+        try:
+            await budget.load()
+            interval = budget.search_interval(len(keywords))
+            async with Fetcher(session=http_session(), limiter=budget) as fetcher:
+                searches = await asyncio.gather(
+                    *(
+                        cached_search(
+                            fetcher,
+                            budget,
+                            cache,
+                            keyword,
+                            event_type,
+                            max_results,
+                            order,
+                            interval,
+                        )
+                        if use_cache
+                        else search_videos(fetcher, keyword, event_type, max_results, order)
+                        for keyword in keywords
+                    )
+                )
+                # The same video often matches several keywords; load it once
+                video_ids = list(
+                    dict.fromkeys(
+                        video_id for videos in searches if videos for video_id in videos
+                    )
+                )
+                return await get_video_data(fetcher, video_ids)
+        finally:
+            await budget.flush()
 
 if __name__ == "__main__":
     keywords = ["cardano", "singularity net", "hoskinson"]
@@ -0,0 +1,155 @@
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+import redis.exceptions
+from app.utils.encoding import dumps, loads
+from app.utils.logger import logger
+
+YOUTUBE_DAILY_QUOTA = int(os.environ.get("YOUTUBE_DAILY_QUOTA", 10000))
+# Share of the daily quota kept back for manual use and retries
+YOUTUBE_QUOTA_RESERVE = float(os.environ.get("YOUTUBE_QUOTA_RESERVE", 0.1))
+
+# Units charged per call, by endpoint
+QUOTA_COSTS = {"search": 100, "videos": 1}
+
+# YouTube quotas reset at midnight Pacific Time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# How far before the previous search publishedAfter reaches back, so videos
+# whose publish time predates the moment they became visible are not missed
+WATERMARK_OVERLAP = timedelta(hours=6)
+SEARCH_CACHE_TTL = 24 * 60 * 60
+
+
+class QuotaBudget:
+    """
+    Daily YouTube Data API quota accounting in Redis. Used as the Fetcher
+    limiter, it charges every call it sees to the day's counter by endpoint. It also spreads the remaining budget over the rest of the day,
+    which sets how long cached search results stay fresh.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        daily_budget=YOUTUBE_DAILY_QUOTA,
+        reserve=YOUTUBE_QUOTA_RESERVE,
+        min_interval=30 * 60,
+    ):
+        self.redis_client = redis_client
+        self.budget = int(daily_budget * (1 - reserve))
+        self.min_interval = min_interval
+        self.used = 0
+        self.pending = Counter()
+
+    @staticmethod
+    def day():
+        return datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def seconds_until_reset():
+        now = datetime.now(QUOTA_TIMEZONE)
+        midnight = (now + timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        return (midnight - now).total_seconds()
+
+    def key(self):
+        return f"youtube:quota:{self.day()}"
+
+    async def load(self):
+        try:
+            self.used = int(await self.redis_client.hget(self.key(), "total") or 0)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error reading YouTube quota usage: {e}")
+
+    def remaining(self):
+        return self.budget - self.used - sum(self.pending.values())
+
+    def can_afford(self, endpoint, calls=1):
+        return self.remaining() >= QUOTA_COSTS[endpoint] * calls
+
+    def search_interval(self, searches):
+        """
+        Seconds between rounds of `searches` search calls that the remaining
+        budget can sustain until the quota resets, never below min_interval.
+        """
+        round_cost = QUOTA_COSTS["search"] * max(searches, 1)
+        rounds = self.remaining() // round_cost
+        seconds_left = self.seconds_until_reset()
+        if rounds <= 0:
+            return seconds_left
+        return max(self.min_interval, seconds_left / rounds)
+
+    async def acquire(self, url):
+        pass
+
+    async def update(self, url, status, headers):
+        # Failed calls are charged too, except when the quota is already gone
+        endpoint = urlparse(url).path.rsplit("/", 1)[-1]
+        if endpoint in QUOTA_COSTS and status != 403:
+            self.pending[endpoint] += QUOTA_COSTS[endpoint]
+
+    async def flush(self):
+        if not self.pending:
+            return
+        key = self.key()
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for endpoint, units in self.pending.items():
+                    pipe.hincrby(key, endpoint, units)
+                pipe.hincrby(key, "total", sum(self.pending.values()))
+                pipe.expire(key, 2 * 24 * 60 * 60)
+                results = await pipe.execute()
+            self.used = results[-2]
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error recording YouTube quota usage: {e}")
+            return
+        logger.info(
+            f"YouTube quota: {dict(self.pending)} charged, {self.used}/{self.budget} used today"
+        )
+        self.pending.clear()
+
+
+class SearchCache:
+    """
+    Cached search.list results per (keyword, eventType, order), together with
+    the publishedAfter watermark for the next search of the same query.
+    """
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+
+    @staticmethod
+    def key(keyword, event_type, order):
+        return f"youtube:search:{keyword}:{event_type}:{order}"
+
+    async def get(self, keyword, event_type, order):
+        try:
+            cached = await self.redis_client.get(self.key(keyword, event_type, order))
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error reading YouTube search cache: {e}")
+            return None
+        return loads(cached) if cached else None
+
+    async def set(self, keyword, event_type, order, video_ids, searched_at):
+        published_after = (
+            datetime.fromtimestamp(searched_at, timezone.utc) - WATERMARK_OVERLAP
+        )
+        entry = {
+            "video_ids": video_ids,
+            "searched_at": searched_at,
+            "published_after": published_after.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        try:
+            await self.redis_client.set(
+                self.key(keyword, event_type, order), dumps(entry), ex=SEARCH_CACHE_TTL
+            )
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error writing YouTube search cache: {e}")
+
+    @staticmethod
+    def is_fresh(entry, interval):
+        return entry is not None and time.time() - entry["searched_at"] < interval
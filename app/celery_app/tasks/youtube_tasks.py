@@ -1,16 +1,29 @@
-import json
-import asyncio
 from app.celery_app.celery_instance import app
+from app.celery_app.sources import YOUTUBE_KEYWORDS, YOUTUBE_MAX_RESULTS
 from app.redis.redis_instance import get_redis_client
+from app.redis.dedup import SeenStore
 from .youtube import fetch_youtube_data
+from .fanout import fan_out, publish_delta, run_source
 
 redis_client = get_redis_client()
+seen_store = SeenStore(redis_client, "youtube", "id")
 
 
 @app.task
-def broadcast_youtube_data():
-    keywords = ["cardano", "singularity net", "hoskinson"]
-    max_results = 3
-    messages = asyncio.run(fetch_youtube_data(keywords, max_results))
-    message_json = json.dumps(messages)
-    redis_client.publish("notification_channel", message_json)
+def fetch_youtube_videos(keywords, full_snapshot=False):
+    # All keywords are searched in one task so videos matching several of
+    # them are loaded once and videos.list calls are batched across keywords
+    videos = run_source(
+        "youtube",
+        fetch_youtube_data(keywords, YOUTUBE_MAX_RESULTS, use_cache=not full_snapshot),
+    )
+    return publish_delta(seen_store, videos, full_snapshot, "youtube")
+
+
+@app.task
+def broadcast_youtube_data(full_snapshot=False):
+    fan_out(
+        [fetch_youtube_videos.s(YOUTUBE_KEYWORDS, full_snapshot)],
+        "youtube",
+        full_snapshot,
+    )
@@ -0,0 +1,86 @@
+# app/redis/cache.py
+import time
+import asyncio
+from collections import OrderedDict
+import redis.exceptions
+from app.utils.encoding import dumps, loads
+from app.utils.logger import logger
+
+
+class LRUCache:
+    """
+    In-process LRU cache whose entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize=1024, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class TieredCache:
+    """
+    Two-tier read-through cache: an in-process LRU in front of Redis keys
+    with a TTL, in front of the `loader` coroutine. Concurrent requests for
+    the same key share a single in-flight load, which runs to completion
+    even when some of them are cancelled. Missing values (None) are not
+    cached, and Redis being unavailable only costs the loader call.
+    """
+
+    def __init__(self, redis_client, namespace, ttl, local):
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = local
+        self.inflight = {}
+
+    async def get(self, key, loader):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.load(key, loader))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # A cancelled caller stops waiting without cancelling the shared load
+        return await asyncio.shield(task)
+
+    async def load(self, key, loader):
+        redis_key = f"{self.namespace}:{key}"
+        value = None
+        try:
+            cached = await self.redis_client.get(redis_key)
+            if cached is not None:
+                value = loads(cached)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error reading {redis_key} from Redis: {e}")
+
+        if value is None:
+            value = await loader()
+            if value is None:
+                return None
+            try:
+                await self.redis_client.set(redis_key, dumps(value), ex=self.ttl)
+            except redis.exceptions.RedisError as e:
+                logger.warning(f"Error writing {redis_key} to Redis: {e}")
+
+        self.local.set(key, value)
+        return value
@@ -0,0 +1,75 @@
+# app/redis/dedup.py
+import hashlib
+from app.utils.encoding import dumps
+
+SEEN_TTL = 7 * 24 * 60 * 60
+
+# Compare each key's digest with ARGV and store it when it differs, in one
+# step so concurrent tasks seeing the same item cannot both report it new.
+# Returns 1 per new or changed key and 0 per unchanged one
+FILTER_NEW_SCRIPT = """
+local ttl = ARGV[1]
+local fresh = {}
+for index, key in ipairs(KEYS) do
+    local digest = ARGV[index + 1]
+    if redis.call("GET", key) == digest then
+        redis.call("EXPIRE", key, ttl)
+        fresh[index] = 0
+    else
+        redis.call("SET", key, digest, "EX", ttl)
+        fresh[index] = 1
+    end
+end
+return fresh
+"""
+
+
+def stable_hash(value):
+    return hashlib.sha1(str(value).encode("utf-8")).hexdigest()
+
+
+def content_digest(item):
+    return hashlib.sha1(dumps(item)).hexdigest()
+
+
+class SeenStore:
+    """
+    Redis-backed record of the items a source has already published. Each item
+    is keyed by a stable hash of its identity field and stores a digest of its
+    content, so an item counts as new when its key is missing and as changed
+    when the digest differs. Keys expire after `ttl` seconds. Checking and
+    marking items happens atomically in a Lua script, so tasks running in
+    parallel never publish the same item twice.
+    """
+
+    def __init__(self, redis_client, source, id_field, ttl=SEEN_TTL):
+        self.redis_client = redis_client
+        self.source = source
+        self.id_field = id_field
+        self.ttl = ttl
+        self.filter_script = redis_client.register_script(FILTER_NEW_SCRIPT)
+
+    def key(self, item):
+        return f"seen:{self.source}:{stable_hash(getattr(item, self.id_field))}"
+
+    def filter_new(self, items, full_snapshot=False):
+        """
+        Return the items that are new or changed since they were last seen and
+        mark them as seen. With `full_snapshot` every item is returned.
+        """
+        if not items:
+            return []
+        # The first occurrence of an item within one call wins
+        unique = {}
+        for item in items:
+            unique.setdefault(self.key(item), item)
+        keys = list(unique)
+        digests = [content_digest(item) for item in unique.values()]
+
+        # Unchanged items get their TTL refreshed so they do not expire and reappear
+        fresh = self.filter_script(keys=keys, args=[self.ttl] + digests)
+        return [
+            item
+            for item, is_fresh in zip(unique.values(), fresh)
+            if is_fresh or full_snapshot
+        ]
@@ -0,0 +1,160 @@
+# app/redis/item_store.py
+import os
+import time
+from app.redis.dedup import stable_hash
+from app.utils.encoding import dumps, loads
+
+# Field identifying an item of each source
+ITEM_ID_FIELDS = {"news": "link", "discord": "message_id", "youtube": "id"}
+
+# Items older than this many seconds are dropped from the store
+ITEM_RETENTION = int(os.environ.get("ITEM_RETENTION", 30 * 24 * 60 * 60))
+
+VERSION_KEY = "items:version"
+
+
+def item_key(source, item_id):
+    return f"item:{source}:{stable_hash(item_id)}"
+
+
+def index_key(source=None, project=None):
+    """
+    Sorted set of item keys scored by timestamp: every item, or the items of
+    one project or source.
+    """
+    if project:
+        return f"items:by_time:project:{project.lower()}"
+    if source:
+        return f"items:by_time:source:{source}"
+    return "items:by_time"
+
+
+class ItemStore:
+    """
+    Published items kept in Redis for querying: one hash per item holding its
+    JSON, indexed by timestamp in sorted sets for all items, each source and
+    each project. Every write bumps a version counter that readers use as a
+    cheap validator. Items without a timestamp are indexed at write time.
+    """
+
+    def __init__(self, redis_client, retention=ITEM_RETENTION):
+        self.redis_client = redis_client
+        self.retention = retention
+
+    def save(self, source, items):
+        if not items:
+            return
+        now = time.time()
+        id_field = ITEM_ID_FIELDS[source]
+        indexes = {index_key(), index_key(source=source)}
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for item in items:
+                key = item_key(source, getattr(item, id_field))
+                timestamp = item.timestamp or now
+                project = getattr(item, "message_project", None)
+                mapping = {"source": source, "timestamp": timestamp, "data": dumps(item)}
+                if project:
+                    mapping["project"] = project
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self.retention)
+                pipe.zadd(index_key(), {key: timestamp})
+                pipe.zadd(index_key(source=source), {key: timestamp})
+                if project:
+                    indexes.add(index_key(project=project))
+                    pipe.zadd(index_key(project=project), {key: timestamp})
+            for index in indexes:
+                pipe.zremrangebyscore(index, "-inf", now - self.retention)
+            pipe.incr(VERSION_KEY)
+            pipe.execute()
+
+
+def encode_cursor(timestamp, key):
+    return f"{timestamp!r}:{key.decode('utf-8')}"
+
+
+def decode_cursor(cursor):
+    """
+    Return the (timestamp, key) position a cursor points at, raising
+    ValueError if it is malformed.
+    """
+    timestamp, _, key = cursor.partition(":")
+    if not key:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return float(timestamp), key.encode("utf-8")
+
+
+async def item_version(redis_client):
+    return int(await redis_client.get(VERSION_KEY) or 0)
+
+
+async def query_items(
+    redis_client, source=None, project=None, since=None, until=None, cursor=None, limit=50
+):
+    """
+    Items ordered by timestamp, oldest first. With `cursor` or `since` the
+    page starts after that position; otherwise it holds the latest `limit`
+    items. Returns (items, next cursor, whether more items follow). Index
+    entries whose item has already expired are skipped and trimmed from the
+    index, so pages stay full.
+    """
+    key = index_key(source=source, project=project)
+    # The project index spans sources, so narrow it by the item key prefix
+    prefix = f"item:{source}:".encode("utf-8") if source and project else None
+    high = until if until is not None else "+inf"
+    after = decode_cursor(cursor) if cursor else None
+    latest = after is None and since is None
+    low = after[0] if after else f"({since}"
+
+    items = []
+    # (score, member) of every item, to build the cursor from
+    positions = []
+    more = False
+    expired = []
+    start = 0
+    while not more:
+        if latest:
+            chunk = await redis_client.zrevrangebyscore(
+                key, high, "-inf", start=start, num=limit + 1, withscores=True
+            )
+        else:
+            chunk = await redis_client.zrangebyscore(
+                key, low, high, start=start, num=limit + 1, withscores=True
+            )
+        start += len(chunk)
+        rows = [
+            (member, score)
+            for member, score in chunk
+            # Members sharing the cursor's score sort by key
+            if (after is None or (score, member) > after)
+            and (prefix is None or member.startswith(prefix))
+        ]
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for member, _ in rows:
+                pipe.hmget(member, "source", "data")
+            entries = await pipe.execute()
+
+        for (member, score), (item_source, data) in zip(rows, entries):
+            if data is None:
+                expired.append(member)
+                continue
+            if len(items) == limit:
+                # Another item follows the page, unless this is the latest
+                # page, which ends at the newest item
+                more = not latest
+                break
+            items.append(
+                {"source": item_source.decode("utf-8"), "timestamp": score, "item": loads(data)}
+            )
+            positions.append((score, member))
+        if len(chunk) < limit + 1 or (latest and len(items) == limit):
+            break
+
+    if expired:
+        # Trimmed only once the scan is done, since it pages by offset
+        await redis_client.zrem(key, *expired)
+    if not items:
+        return [], cursor, False
+    if latest:
+        items.reverse()
+        positions.reverse()
+    return items, encode_cursor(*positions[-1]), more
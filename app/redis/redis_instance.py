@@ -1,10 +1,24 @@
 # app/redis/redis_instance.py
 import redis
+import redis.asyncio
 
 # Configure Redis connection
 redis_client = redis.Redis(host="redis", port=6379, db=2)
 
+# Asyncio flavour of the same connection, used from the Tornado IOLoop
+async_redis_client = redis.asyncio.Redis(host="redis", port=6379, db=2)
+
 
 # Expose the Redis client instance
 def get_redis_client():
     return redis_client
+
+
+# Expose the asyncio Redis client instance
+def get_async_redis_client():
+    return async_redis_client
+
+
+# Fresh asyncio client for code that runs on a short-lived event loop
+def create_async_redis_client():
+    return redis.asyncio.Redis(host="redis", port=6379, db=2)
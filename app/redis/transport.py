@@ -0,0 +1,30 @@
+# app/redis/transport.py
+import os
+
+PUBSUB_TRANSPORT = "pubsub"
+STREAM_TRANSPORT = "stream"
+
+NOTIFICATION_CHANNEL = "notification_channel"
+NOTIFICATION_STREAM = "notification_stream"
+# Each source publishes to its own channel, e.g. notification_channel:news
+NOTIFICATION_PATTERN = f"{NOTIFICATION_CHANNEL}:*"
+
+# "pubsub" is fire-and-forget; "stream" keeps a trimmed, replayable log
+NOTIFICATION_TRANSPORT = os.environ.get("NOTIFICATION_TRANSPORT", PUBSUB_TRANSPORT)
+STREAM_MAXLEN = int(os.environ.get("NOTIFICATION_STREAM_MAXLEN", 1000))
+
+
+def notification_channel(source):
+    return f"{NOTIFICATION_CHANNEL}:{source}"
+
+
+def publish_notification(redis_client, payload, source):
+    if NOTIFICATION_TRANSPORT == STREAM_TRANSPORT:
+        redis_client.xadd(
+            NOTIFICATION_STREAM,
+            {"data": payload, "source": source},
+            maxlen=STREAM_MAXLEN,
+            approximate=True,
+        )
+    else:
+        redis_client.publish(notification_channel(source), payload)
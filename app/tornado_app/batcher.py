@@ -0,0 +1,93 @@
+# app/tornado_app/batcher.py
+import os
+from tornado.ioloop import IOLoop
+from app.redis.item_store import ITEM_ID_FIELDS
+from app.utils.encoding import loads
+from app.utils.logger import logger
+
+# Messages arriving within this many milliseconds of the first pending one
+# are broadcast together; 0 broadcasts every message as it arrives
+WS_BATCH_WINDOW_MS = float(os.environ.get("WS_BATCH_WINDOW_MS", 50))
+# Flush early once this many messages are pending
+WS_BATCH_MAX_MESSAGES = int(os.environ.get("WS_BATCH_MAX_MESSAGES", 20))
+
+
+def channel_source(channel):
+    # notification_channel:<source>
+    return channel.decode("utf-8").partition(":")[2]
+
+
+def merge_items(batch):
+    """
+    Decode the (channel, message) pairs in `batch` into one list of (source,
+    item) pairs. An item published more than once keeps its first position
+    and its latest content.
+    """
+    merged = {}
+    for channel, message in batch:
+        try:
+            items = loads(message)
+        except Exception as e:
+            logger.error(f"Error decoding message: {e}")
+            continue
+        if isinstance(items, dict):
+            items = [items]
+        source = channel_source(channel)
+        id_field = ITEM_ID_FIELDS.get(source)
+        for item in items:
+            item_id = item.get(id_field) if id_field else None
+            key = (source, item_id) if item_id is not None else object()
+            merged[key] = (source, item)
+    return list(merged.values())
+
+
+class BroadcastBatcher:
+    """
+    Collects the messages received within a `window` of seconds, or until
+    `max_messages` are pending, and hands them to `on_flush` as one batch so
+    each client gets a single frame per source for the lot. The window
+    starts with the first pending message, which bounds the delay any
+    message is held back.
+    """
+
+    def __init__(
+        self,
+        on_flush,
+        window=WS_BATCH_WINDOW_MS / 1000,
+        max_messages=WS_BATCH_MAX_MESSAGES,
+    ):
+        self.on_flush = on_flush
+        self.window = window
+        self.max_messages = max_messages
+        self.pending = []
+        self.timeout = None
+        self.batches = 0
+        self.messages = 0
+
+    def add(self, channel, data):
+        self.pending.append((channel, data))
+        if self.window <= 0 or len(self.pending) >= self.max_messages:
+            self.flush()
+        elif self.timeout is None:
+            self.timeout = IOLoop.current().call_later(self.window, self.flush)
+
+    def flush(self):
+        if self.timeout is not None:
+            IOLoop.current().remove_timeout(self.timeout)
+            self.timeout = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.messages += len(batch)
+        try:
+            self.on_flush(batch)
+        except Exception as e:
+            logger.exception(f"Error broadcasting batch of {len(batch)} messages: {e}")
+
+    def stats(self):
+        return {
+            "pending": len(self.pending),
+            "batches": self.batches,
+            "messages": self.messages,
+        }
@@ -0,0 +1,81 @@
+# app/tornado_app/frames.py
+import os
+import zlib
+from app.utils.encoding import dumps, loads, msgpack, packb
+
+# Wire formats a client can ask for with ?format=
+#   legacy:  {"message": "<payload as a JSON string>"}, what clients always got
+#   json:    {"message": <payload>}, the published JSON spliced in unescaped
+#   msgpack: {"message": <payload>} as MessagePack in a binary frame
+LEGACY_FORMAT = "legacy"
+JSON_FORMAT = "json"
+MSGPACK_FORMAT = "msgpack"
+FRAME_FORMATS = (LEGACY_FORMAT, JSON_FORMAT, MSGPACK_FORMAT)
+
+WS_FRAME_FORMAT = os.environ.get("WS_FRAME_FORMAT", LEGACY_FORMAT)
+# Offer permessage-deflate to clients that ask for it
+WS_COMPRESSION = os.environ.get("WS_COMPRESSION", "true").lower() in ("1", "true", "yes")
+
+
+def available_formats():
+    if msgpack is None:
+        return (LEGACY_FORMAT, JSON_FORMAT)
+    return FRAME_FORMATS
+
+
+def deflate(data, level, wbits, mem_level):
+    """
+    Compress one message the way Tornado's permessage-deflate compressor does
+    with a fresh context. The output does not refer back to earlier messages,
+    so the same bytes are valid on every connection that negotiated these
+    parameters, with or without context takeover.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -wbits, mem_level)
+    data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    return data[:-4]
+
+
+class Frame:
+    """
+    A message shared by every client it is queued for. `payload` is the JSON
+    published by the sources; it is encoded once per wire format and deflated
+    once per compression setting however many clients receive it. Frames with
+    the same key are merged into one under the coalesce policy. Frames that
+    are not `wrap`ped, such as replies to a client, are sent as they are.
+    """
+
+    __slots__ = ("key", "payload", "wrap", "encoded")
+
+    def __init__(self, key, payload, wrap=True):
+        self.key = key
+        self.payload = payload
+        self.wrap = wrap
+        self.encoded = {}
+
+    def encode(self, frame_format):
+        """
+        Return (data, binary) for `frame_format`.
+        """
+        if frame_format not in self.encoded:
+            self.encoded[frame_format] = self.build(frame_format)
+        return self.encoded[frame_format]
+
+    def build(self, frame_format):
+        if frame_format == MSGPACK_FORMAT:
+            message = loads(self.payload)
+            return packb({"message": message} if self.wrap else message), True
+        if not self.wrap:
+            return self.payload, False
+        if frame_format == JSON_FORMAT:
+            return b'{"message":' + self.payload + b"}", False
+        return dumps({"message": self.payload.decode("utf-8")}), False
+
+    def deflate(self, frame_format, level, wbits, mem_level):
+        """
+        Return (compressed data, binary) for `frame_format`.
+        """
+        key = (frame_format, level, wbits, mem_level)
+        if key not in self.encoded:
+            data, binary = self.encode(frame_format)
+            self.encoded[key] = deflate(data, level, wbits, mem_level), binary
+        return self.encoded[key]
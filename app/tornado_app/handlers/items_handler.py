@@ -0,0 +1,66 @@
+import tornado.web
+from app.redis.dedup import stable_hash
+from app.redis.item_store import ITEM_ID_FIELDS, item_version, query_items
+from app.redis.redis_instance import get_async_redis_client
+from app.utils.encoding import dumps
+from app.utils.logger import logger
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class ItemsHandler(tornado.web.RequestHandler):
+    """
+    GET /items?since=&until=&source=&project=&limit=&cursor=
+
+    Stored items ordered by timestamp, oldest first, as
+    {"items": [...], "next": cursor, "more": bool}. Without `since` or
+    `cursor` the page holds the latest items; pass `next` back as `cursor`
+    to page forward or to poll for newer items. The ETag changes whenever
+    items are written, so an unchanged poll is answered with 304 without
+    running the query.
+    """
+
+    def float_argument(self, name):
+        value = self.get_argument(name, None)
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"{name} must be a Unix timestamp")
+
+    async def get(self):
+        source = self.get_argument("source", None)
+        if source is not None and source not in ITEM_ID_FIELDS:
+            raise tornado.web.HTTPError(400, f"Unknown source: {source}")
+        project = self.get_argument("project", None)
+        since = self.float_argument("since")
+        until = self.float_argument("until")
+        cursor = self.get_argument("cursor", None)
+        try:
+            limit = min(int(self.get_argument("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            raise tornado.web.HTTPError(400, "limit must be an integer")
+        if limit < 1:
+            raise tornado.web.HTTPError(400, "limit must be positive")
+
+        redis_client = get_async_redis_client()
+        version = await item_version(redis_client)
+        self.set_header("Cache-Control", "no-cache")
+        # Results only change when items are written, so the store version
+        # and the query identify the response
+        self.set_header("Etag", f'"{version}-{stable_hash(self.request.query)}"')
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+
+        try:
+            items, next_cursor, more = await query_items(
+                redis_client, source, project, since, until, cursor, limit
+            )
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, str(e))
+        logger.info(f"Serving {len(items)} items for {self.request.query}")
+        self.set_header("Content-Type", "application/json")
+        self.write(dumps({"items": items, "next": next_cursor, "more": more}))
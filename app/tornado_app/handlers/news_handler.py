@@ -1,61 +1,274 @@
-import json
+import os
+from collections import defaultdict
 import tornado.web
 import tornado.websocket
-from tornado.ioloop import PeriodicCallback
-from app.redis.redis_instance import get_redis_client
+from tornado.ioloop import IOLoop
+from tornado.iostream import StreamClosedError
+from app.tornado_app.batcher import BroadcastBatcher, merge_items
+from app.tornado_app.handlers.search_handler import search_index
+from app.tornado_app.frames import Frame, WS_COMPRESSION, WS_FRAME_FORMAT, available_formats
+from app.tornado_app.outbound import OutboundQueue
+from app.tornado_app.subscriber import RedisSubscriber, RedisStreamSubscriber
+from app.tornado_app.topics import TopicIndex, item_topics, parse_topic
+from app.redis.transport import (
+    NOTIFICATION_PATTERN,
+    NOTIFICATION_STREAM,
+    NOTIFICATION_TRANSPORT,
+    STREAM_TRANSPORT,
+)
+from app.utils.encoding import dumps, loads
 from app.utils.logger import logger
 
 
 class NewsHandler(tornado.websocket.WebSocketHandler):
+    """
+    Pushes published items to WebSocket clients. Clients may narrow what they
+    receive to topics, either with `?topic=source:news&topic=project:cardano`
+    on connect or by sending {"action": "subscribe" | "unsubscribe",
+    "topics": [...]}; clients without topics receive everything. The wire
+    format is picked with `?format=` (see frames.py), and when the client
+    negotiates permessage-deflate every frame is compressed once and the
+    same bytes are written to all clients sharing its settings.
+    """
+
     clients = set()
-    pubsub = None
+    index = TopicIndex()
+    evicted = 0
 
     def check_origin(self, origin):
         return True
 
+    def get_compression_options(self):
+        return {} if WS_COMPRESSION else None
+
     def open(self):
+        self.outbound = OutboundQueue()
+        self.frame_format = self.get_argument("format", WS_FRAME_FORMAT)
+        if self.frame_format not in available_formats():
+            logger.warning(f"Unsupported frame format {self.frame_format}, using {WS_FRAME_FORMAT}")
+            self.frame_format = WS_FRAME_FORMAT
+        topics = self.parse_topics(self.get_arguments("topic"))
+        if topics:
+            self.index.subscribe(self, topics)
+        # Catch the client up on recent messages in one frame before it joins
+        # the broadcast
+        backlog = subscriber.recent()
+        if backlog:
+            for _, frame in self.route(backlog, [self]):
+                self.outbound.put(frame)
         self.clients.add(self)
+        IOLoop.current().spawn_callback(self.drain_outbound)
         logger.info(
             f"WebSocket opened for client: {self}. Total connected clients: {len(self.clients)}"
         )
 
-        if not self.pubsub:
-            self.pubsub = get_redis_client().pubsub()
-            self.pubsub.subscribe("notification_channel")
-            PeriodicCallback(self.listen_for_messages, 100).start()
-
     def on_close(self):
-        self.clients.remove(self)
+        self.clients.discard(self)
+        self.index.remove(self)
+        self.outbound.close()
         logger.info(
             f"WebSocket closed for client: {self}. Total connected clients: {len(self.clients)}"
         )
 
-        # Unsubscribe from the Redis channel
-        if self.pubsub:
-            self.pubsub.unsubscribe("notification_channel")
-
     def on_message(self, message):
         logger.info(f"Received message from client: {self}. Message: {message}")
-        # self.broadcast_to_clients(message)
-        pass
-
-    def broadcast_to_clients(self, message):
         try:
-            # Decode the byte string to a regular string
-            message_str = message.decode("utf-8")
-            msg = json.dumps({"message": message_str})
-            for client in self.clients:
-                try:
-                    client.write_message(msg)
-                except Exception as e:
-                    logger.error(f"Error broadcasting message: {e}")
+            request = loads(message)
+            action = request["action"]
+            topics = self.parse_topics(request["topics"])
         except Exception as e:
-            logger.error(f"Error decoding message: {e}")
-
-    def listen_for_messages(self):
-        if self.pubsub:
-            message = self.pubsub.get_message()
-            if message and message["type"] == "message":
-                data = message["data"]
-                logger.info(f"Received message from Redis: {data}")
-                self.broadcast_to_clients(data)
+            logger.warning(f"Ignoring invalid message from client {self}: {e}")
+            return
+        if action == "subscribe":
+            self.index.subscribe(self, topics)
+        elif action == "unsubscribe":
+            self.index.unsubscribe(self, topics)
+        else:
+            logger.warning(f"Ignoring unknown action from client {self}: {action}")
+            return
+        reply = {"subscriptions": self.index.subscriptions(self)}
+        self.enqueue(Frame(None, dumps(reply), wrap=False))
+
+    @staticmethod
+    def parse_topics(topics):
+        return {topic for topic in map(parse_topic, topics) if topic}
+
+    async def drain_outbound(self):
+        while True:
+            frame = await self.outbound.get()
+            if frame is None:
+                return
+            try:
+                self.outbound.bytes_sent += await self.send_frame(frame)
+                self.outbound.sent += 1
+            except tornado.websocket.WebSocketClosedError:
+                return
+            except Exception as e:
+                logger.error(f"Error writing message to client {self}: {e}")
+
+    @staticmethod
+    def shared_deflate_params(connection):
+        """
+        (level, wbits, mem_level) of the connection's permessage-deflate
+        compressor, or None when it has none or the Tornado internals read
+        here are missing. WebSocketHandler.write_message always compresses on
+        the connection's own context, so sharing one compressed copy across
+        clients has to go through these private attributes. tornado is pinned
+        in requirements.txt for that reason, tests/test_frames.py checks that
+        its client decodes the shared frames, and a version missing these
+        attributes falls back to write_message.
+        """
+        compressor = getattr(connection, "_compressor", None)
+        try:
+            params = (
+                compressor._compression_level,
+                compressor._max_wbits,
+                compressor._mem_level,
+            )
+        except AttributeError:
+            return None
+        if not hasattr(connection, "_write_frame") or not hasattr(connection, "RSV1"):
+            return None
+        return params
+
+    async def send_frame(self, frame):
+        """
+        Write `frame` in the client's format and return the payload bytes sent.
+        """
+        connection = self.ws_connection
+        params = self.shared_deflate_params(connection)
+        if params is None:
+            data, binary = frame.encode(self.frame_format)
+            await self.write_message(data, binary=binary)
+            return len(data)
+        if connection.is_closing():
+            raise tornado.websocket.WebSocketClosedError()
+        # Write the shared deflated bytes as they are rather than having the
+        # connection compress its own copy. Every data frame goes through here,
+        # so the connection's own compression context is never used.
+        data, binary = frame.deflate(self.frame_format, *params)
+        try:
+            await connection._write_frame(
+                True, 0x2 if binary else 0x1, data, flags=connection.RSV1
+            )
+        except StreamClosedError:
+            raise tornado.websocket.WebSocketClosedError()
+        return len(data)
+
+    def enqueue(self, frame):
+        if not self.outbound.put(frame):
+            NewsHandler.evicted += 1
+            logger.warning(f"Disconnecting slow client: {self}")
+            self.clients.discard(self)
+            self.outbound.close()
+            self.close(code=1013, reason="Client too slow")
+
+    @staticmethod
+    def make_frame(message, key=None):
+        # The published JSON is kept as is and only encoded per wire format
+        return Frame(key, message)
+
+    @classmethod
+    def route(cls, batch, clients):
+        """
+        Yield a (client, frame) pair for every one of `clients` that wants some
+        of the items in `batch`, a list of (channel, message) pairs. Messages
+        are merged into one frame per client and source, so every frame still
+        holds the items of a single source as clients expect.
+        """
+        by_channel = {}
+        for channel, message in batch:
+            by_channel.setdefault(channel, []).append((channel, message))
+        for channel, messages in by_channel.items():
+            yield from cls.route_channel(channel, messages, clients)
+
+    @classmethod
+    def route_channel(cls, key, batch, clients):
+        """
+        Route the messages of one channel. Clients without topics share one
+        frame (the original bytes for a single message); subscribed clients
+        get only the items matching their topics, and clients that want the
+        same items share one frame.
+        """
+        subscribed = {client for client in clients if cls.index.is_filtered(client)}
+        everything = [client for client in clients if client not in subscribed]
+        items = None
+        if everything:
+            if len(batch) == 1:
+                payload = batch[0][1]
+            else:
+                items = merge_items(batch)
+                payload = dumps([item for _, item in items])
+            frame = cls.make_frame(payload, key=key)
+            for client in everything:
+                yield client, frame
+        if not subscribed:
+            return
+
+        if items is None:
+            items = merge_items(batch)
+        wanted = defaultdict(list)
+        for position, (source, item) in enumerate(items):
+            for client in cls.index.match(item_topics(source, item)) & subscribed:
+                wanted[client].append(position)
+
+        frames = {}
+        for client, positions in wanted.items():
+            positions = tuple(positions)
+            if positions not in frames:
+                selected = [items[position][1] for position in positions]
+                frames[positions] = cls.make_frame(dumps(selected), key=key)
+            yield client, frames[positions]
+
+    @classmethod
+    def broadcast_to_clients(cls, batch):
+        for client, frame in cls.route(batch, list(cls.clients)):
+            try:
+                client.enqueue(frame)
+            except Exception as e:
+                logger.error(f"Error broadcasting message: {e}")
+
+    @classmethod
+    def listen_for_messages(cls, channel, data):
+        logger.info(f"Received message from Redis: {len(data)} bytes")
+        batcher.add(channel, data)
+        for source, item in merge_items([(channel, data)]):
+            search_index.add(source, item)
+
+    @classmethod
+    def pending(cls):
+        return sum(len(client.outbound) for client in cls.clients)
+
+    @classmethod
+    def close_all(cls, code=1001, reason="Server shutting down"):
+        for client in list(cls.clients):
+            client.close(code=code, reason=reason)
+
+    @classmethod
+    def stats(cls):
+        return {
+            "pid": os.getpid(),
+            "clients": len(cls.clients),
+            "evicted": cls.evicted,
+            "topics": cls.index.stats(),
+            "batching": batcher.stats(),
+            "queues": [
+                dict(
+                    client.outbound.stats(),
+                    client=client.request.remote_ip,
+                    format=client.frame_format,
+                    compressed=getattr(client.ws_connection, "_compressor", None) is not None,
+                )
+                for client in cls.clients
+            ],
+        }
+
+
+batcher = BroadcastBatcher(NewsHandler.broadcast_to_clients)
+
+if NOTIFICATION_TRANSPORT == STREAM_TRANSPORT:
+    subscriber = RedisStreamSubscriber(NOTIFICATION_STREAM, NewsHandler.listen_for_messages)
+else:
+    subscriber = RedisSubscriber(
+        NOTIFICATION_PATTERN, NewsHandler.listen_for_messages, pattern=True
+    )
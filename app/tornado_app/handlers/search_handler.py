@@ -0,0 +1,58 @@
+import time
+import tornado.web
+from app.redis.item_store import ITEM_ID_FIELDS
+from app.tornado_app.search import SearchIndex
+from app.utils.encoding import dumps
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+search_index = SearchIndex()
+
+
+class SearchHandler(tornado.web.RequestHandler):
+    """
+    GET /search?q=&source=&limit=
+
+    Items whose text matches every word of `q` (the last word, or any ending
+    in "*", as a prefix), best match first.
+    """
+
+    def get(self):
+        query = self.get_argument("q", "").strip()
+        if not query:
+            raise tornado.web.HTTPError(400, "q is required")
+        source = self.get_argument("source", None)
+        if source is not None and source not in ITEM_ID_FIELDS:
+            raise tornado.web.HTTPError(400, f"Unknown source: {source}")
+        try:
+            limit = min(int(self.get_argument("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            raise tornado.web.HTTPError(400, "limit must be an integer")
+        if limit < 1:
+            raise tornado.web.HTTPError(400, "limit must be positive")
+        if not search_index.ready:
+            self.set_header("Retry-After", "5")
+            raise tornado.web.HTTPError(503, "Search index is loading")
+
+        started = time.perf_counter()
+        results = search_index.search(query, source, limit)
+        elapsed = time.perf_counter() - started
+        self.set_header("Content-Type", "application/json")
+        self.write(
+            dumps(
+                {
+                    "results": [
+                        {
+                            "source": document.source,
+                            "timestamp": document.timestamp,
+                            "score": round(score, 4),
+                            "item": document.item,
+                        }
+                        for score, document in results
+                    ],
+                    "indexed": len(search_index),
+                    "took_ms": round(elapsed * 1000, 2),
+                }
+            )
+        )
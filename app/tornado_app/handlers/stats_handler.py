@@ -0,0 +1,12 @@
+import tornado.web
+from app.tornado_app.handlers.news_handler import NewsHandler
+from app.tornado_app.registry import ConnectionRegistry
+
+
+class StatsHandler(tornado.web.RequestHandler):
+    async def get(self):
+        # Queue details are for the process serving this request; the
+        # connection counts cover every serving process
+        stats = NewsHandler.stats()
+        stats["processes"] = await ConnectionRegistry.counts()
+        self.write(stats)
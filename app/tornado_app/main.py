@@ -1,11 +1,25 @@
 import os
+import sys
+import signal
+import asyncio
 from dotenv import load_dotenv
 
 import tornado.web
 import tornado.ioloop
+import tornado.httpserver
+import tornado.netutil
+import tornado.process
 
 from app.tornado_app.handlers.main_handler import MainHandler
-from app.tornado_app.handlers.news_handler import NewsHandler
+from app.tornado_app.handlers.items_handler import ItemsHandler
+from app.tornado_app.handlers.search_handler import SearchHandler, search_index
+from app.tornado_app.handlers.news_handler import NewsHandler, batcher, subscriber
+from app.tornado_app.handlers.stats_handler import StatsHandler
+from app.tornado_app.registry import ConnectionRegistry
+from app.tornado_app.search import warm_index
+from app.redis.redis_instance import get_async_redis_client
+from app.tornado_app.subscriber import NODE_ID
+from app.utils.logger import logger
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,6 +27,20 @@ load_dotenv()
 # Get the debug value from the environment variable
 DEBUG = os.environ.get("TORNADO_DEBUG")
 PORT = os.environ.get("TORNADO_PORT", 8000)
+# Number of serving processes, 0 for one per CPU core. Each process runs its
+# own IOLoop, Redis subscriber and set of WebSocket clients
+PROCESSES = int(os.environ.get("TORNADO_PROCESSES", 1))
+# Bind a separate SO_REUSEPORT socket in every process instead of sharing one,
+# so the kernel spreads new connections evenly across processes
+REUSE_PORT = os.environ.get("TORNADO_REUSE_PORT", "").lower() in ("1", "true", "yes")
+# Seconds to let queued frames drain and clients disconnect on shutdown
+SHUTDOWN_TIMEOUT = float(os.environ.get("TORNADO_SHUTDOWN_TIMEOUT", 10))
+# Give up once worker processes have crashed and been restarted this often
+MAX_RESTARTS = 100
+
+# Worker pid -> task id, tracked by the parent process
+children = {}
+stopping = False
 
 
 def make_app():
@@ -20,13 +48,131 @@ def make_app():
         [
             (r"/", MainHandler),
             (r"/news", NewsHandler),
+            (r"/stats", StatsHandler),
+            (r"/items", ItemsHandler),
+            (r"/search", SearchHandler),
         ],
+        compress_response=True,
         debug=DEBUG,
     )
 
 
+async def wait_until(condition, timeout):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.1)
+
+
+async def shutdown(server, registry):
+    logger.info(f"Shutting down with {len(NewsHandler.clients)} connected clients")
+    server.stop()
+    subscriber.stop()
+    batcher.flush()
+    await wait_until(lambda: NewsHandler.pending() == 0, SHUTDOWN_TIMEOUT / 2)
+    NewsHandler.close_all()
+    await wait_until(lambda: not NewsHandler.clients, SHUTDOWN_TIMEOUT / 2)
+    await registry.remove()
+    tornado.ioloop.IOLoop.current().stop()
+
+
+def stop_children(signum, frame):
+    # Runs in the parent process only: pass the signal on to the workers,
+    # which shut down gracefully and exit normally
+    global stopping
+    stopping = True
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for pid in list(children):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def fork_workers(count):
+    """
+    Fork `count` worker processes (0 for one per CPU core) and return the
+    task id of the worker in each child. Like tornado.process.fork_processes,
+    the parent restarts workers that crash and exits once all have exited,
+    but it keeps their pids so a shutdown signal reaches the workers only.
+    """
+    if count == 0:
+        count = tornado.process.cpu_count()
+
+    def start_child(task_id):
+        pid = os.fork()
+        if pid == 0:
+            children.clear()
+            return task_id
+        children[pid] = task_id
+        return None
+
+    for task_id in range(count):
+        if start_child(task_id) is not None:
+            return task_id
+    restarts = 0
+    while children:
+        pid, status = os.wait()
+        if pid not in children:
+            continue
+        task_id = children.pop(pid)
+        if os.WIFSIGNALED(status):
+            logger.warning(f"Worker {task_id} (pid {pid}) killed by signal {os.WTERMSIG(status)}")
+        elif os.WEXITSTATUS(status) != 0:
+            logger.warning(f"Worker {task_id} (pid {pid}) exited with status {os.WEXITSTATUS(status)}")
+        else:
+            continue
+        if stopping:
+            continue
+        restarts += 1
+        if restarts > MAX_RESTARTS:
+            raise RuntimeError("Too many worker restarts, giving up")
+        if start_child(task_id) is not None:
+            return task_id
+    sys.exit(0)
+
+
+def serve():
+    processes = PROCESSES
+    if DEBUG and processes != 1:
+        logger.warning("Autoreload needs a single process, ignoring TORNADO_PROCESSES")
+        processes = 1
+
+    sockets = None
+    if not REUSE_PORT:
+        sockets = tornado.netutil.bind_sockets(int(PORT))
+    task_id = None
+    if processes != 1:
+        signal.signal(signal.SIGTERM, stop_children)
+        signal.signal(signal.SIGINT, stop_children)
+        task_id = fork_workers(processes)
+    if REUSE_PORT:
+        sockets = tornado.netutil.bind_sockets(int(PORT), reuse_port=True)
+
+    # Processes on one host need their own stream cursor and count entry
+    node_id = NODE_ID if task_id is None else f"{NODE_ID}-{task_id}"
+    subscriber.node_id = node_id
+
+    server = tornado.httpserver.HTTPServer(make_app())
+    server.add_sockets(sockets)
+    registry = ConnectionRegistry(node_id, lambda: len(NewsHandler.clients))
+    io_loop = tornado.ioloop.IOLoop.current()
+
+    def on_signal(signum, frame):
+        # A second signal during the graceful shutdown exits immediately
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        io_loop.add_callback_from_signal(shutdown, server, registry)
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    print(f"Tornado app listening on http://localhost:{PORT} ({node_id})")
+    subscriber.start()
+    registry.start()
+    io_loop.spawn_callback(warm_index, search_index, get_async_redis_client())
+    io_loop.start()
+
+
 if __name__ == "__main__":
-    app = make_app()
-    app.listen(int(PORT))
-    print("Tornado app listening on http://localhost:8000")
-    tornado.ioloop.IOLoop.current().start()
+    serve()
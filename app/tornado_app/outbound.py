@@ -0,0 +1,95 @@
+# app/tornado_app/outbound.py
+import os
+from collections import deque
+from tornado.locks import Event
+from app.tornado_app.batcher import merge_items
+from app.tornado_app.frames import Frame
+from app.utils.encoding import dumps
+
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+DISCONNECT = "disconnect"
+OVERFLOW_POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+WS_QUEUE_SIZE = int(os.environ.get("WS_QUEUE_SIZE", 64))
+WS_OVERFLOW_POLICY = os.environ.get("WS_OVERFLOW_POLICY", DROP_OLDEST)
+
+
+class OutboundQueue:
+    """
+    Bounded per-connection queue of outgoing frames (see frames.Frame). `put` never blocks; when
+    the queue is full the overflow policy decides what to give up, and a False
+    return tells the caller the connection should be dropped.
+    """
+
+    def __init__(self, maxsize=WS_QUEUE_SIZE, policy=WS_OVERFLOW_POLICY):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.frames = deque()
+        self.maxsize = maxsize
+        self.policy = policy
+        self.ready = Event()
+        self.closed = False
+        self.sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def put(self, frame):
+        if self.closed:
+            return False
+        if len(self.frames) >= self.maxsize:
+            if self.policy == DISCONNECT:
+                return False
+            merged = self.coalesce(frame) if self.policy == COALESCE else None
+            if merged is None:
+                self.frames.popleft()
+                self.dropped += 1
+            else:
+                frame = merged
+        self.frames.append(frame)
+        self.ready.set()
+        return True
+
+    def coalesce(self, frame):
+        """
+        Take the queued frame with the same key as `frame` out of the queue
+        and return one frame holding the items of both, or None when there is
+        none. A key is the channel the items were published on, so the items
+        are merged as the batcher merges a channel's messages: an item in
+        both frames is sent once, with its latest content.
+        """
+        if frame.key is None:
+            return None
+        for index, queued in enumerate(self.frames):
+            if queued.key == frame.key:
+                del self.frames[index]
+                self.coalesced += 1
+                items = merge_items([(frame.key, queued.payload), (frame.key, frame.payload)])
+                return Frame(frame.key, dumps([item for _, item in items]))
+        return None
+
+    async def get(self):
+        while not self.frames:
+            if self.closed:
+                return None
+            self.ready.clear()
+            await self.ready.wait()
+        return self.frames.popleft()
+
+    def close(self):
+        self.closed = True
+        self.frames.clear()
+        self.ready.set()
+
+    def stats(self):
+        return {
+            "depth": len(self.frames),
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
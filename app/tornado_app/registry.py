@@ -0,0 +1,60 @@
+# app/tornado_app/registry.py
+import os
+import time
+import redis.exceptions
+from tornado.ioloop import IOLoop, PeriodicCallback
+from app.redis.redis_instance import get_async_redis_client
+from app.utils.encoding import dumps, loads
+from app.utils.logger import logger
+
+CONNECTIONS_KEY = "tornado:connections"
+REPORT_INTERVAL = 10
+
+
+class ConnectionRegistry:
+    """
+    Per-process WebSocket connection counts in a Redis hash keyed by node id,
+    refreshed every `interval` seconds, so /stats served by any one process
+    can report all of them. Entries not refreshed for three intervals belong
+    to processes that died without removing themselves and are skipped.
+    """
+
+    def __init__(self, node_id, count, interval=REPORT_INTERVAL):
+        self.node_id = node_id
+        self.count = count
+        self.interval = interval
+        self.callback = None
+
+    def start(self):
+        self.callback = PeriodicCallback(self.report, self.interval * 1000)
+        self.callback.start()
+        IOLoop.current().spawn_callback(self.report)
+
+    async def report(self):
+        entry = {"pid": os.getpid(), "clients": self.count(), "updated": time.time()}
+        try:
+            await get_async_redis_client().hset(CONNECTIONS_KEY, self.node_id, dumps(entry))
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error reporting connection count: {e}")
+
+    async def remove(self):
+        if self.callback:
+            self.callback.stop()
+        try:
+            await get_async_redis_client().hdel(CONNECTIONS_KEY, self.node_id)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error removing connection count: {e}")
+
+    @staticmethod
+    async def counts(interval=REPORT_INTERVAL):
+        try:
+            entries = await get_async_redis_client().hgetall(CONNECTIONS_KEY)
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Error reading connection counts: {e}")
+            return {}
+        counts = {}
+        for node_id, entry in entries.items():
+            entry = loads(entry)
+            if time.time() - entry["updated"] < 3 * interval:
+                counts[node_id.decode("utf-8")] = entry
+        return counts
@@ -0,0 +1,452 @@
+# app/tornado_app/search.py
+import os
+import re
+import math
+import time
+import heapq
+import asyncio
+from bisect import bisect_left, insort
+from collections import Counter
+from contextlib import contextmanager
+from operator import itemgetter
+from app.redis.item_store import ITEM_ID_FIELDS, query_items
+from app.utils.logger import logger
+
+SEARCH_MAX_ITEMS = int(os.environ.get("SEARCH_MAX_ITEMS", 100000))
+SEARCH_MAX_AGE = int(os.environ.get("SEARCH_MAX_AGE", 30 * 24 * 60 * 60))
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+
+# Text fields per source and the weight a term found in each one counts for
+TEXT_FIELDS = {
+    "news": (("title", 2), ("description", 1)),
+    "discord": (("message_text", 1),),
+    "youtube": (("title", 2), ("full_description", 1)),
+}
+
+# A prefix matching more terms than this only uses the most frequent ones
+MAX_PREFIX_TERMS = 50
+
+# Postings read from a list at a time; lists whose entries mostly fail the
+# other words of the query are read in growing batches, up to the maximum
+READ_BATCH = 32
+MAX_READ_BATCH = 1024
+
+# Items indexed, and postings weighted or sorted, between yields to the IOLoop
+# while the index is warmed up
+LOAD_CHUNK = 100
+WEIGHT_CHUNK = 5000
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(TAG_PATTERN.sub(" ", text).lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+class Document:
+    # `id` is the document's number in postings, `terms` maps each term to its
+    # weighted frequency in the document
+    __slots__ = ("id", "key", "source", "timestamp", "item", "terms", "length")
+
+    def __init__(self, id, key, source, timestamp, item, terms, length):
+        self.id = id
+        self.key = key
+        self.source = source
+        self.timestamp = timestamp
+        self.item = item
+        self.terms = terms
+        self.length = length
+
+
+class SearchIndex:
+    """
+    In-process inverted index over the text of published items. Items are
+    added as they arrive; the oldest by timestamp are evicted beyond
+    `max_items` or once older than `max_age` seconds, however late they
+    arrived. Queries match every term, the last one (or any ending in "*")
+    as a prefix, and are ranked by BM25.
+
+    Each posting stores the term's BM25 weight in its document and every term
+    keeps its postings sorted by that weight (newest first on ties). A query
+    reads the lists best first, each time from the one whose next postings
+    score highest relative to its best, and stops once no unread document
+    could still make the top results. Postings read are first checked
+    against the other words' postings, rarest first, so documents missing a
+    word cost a set lookup rather than a full score, and lists where most
+    entries miss are read in larger batches.
+    The idf part of the score is computed per query, but the weights depend
+    on the average document length when they were computed: they are
+    recomputed after a bulk load, while items added later keep the average
+    of their insert time. That average moves slowly once the index is
+    loaded, so rankings drift only slightly; this is a known approximation.
+    """
+
+    def __init__(self, max_items=SEARCH_MAX_ITEMS, max_age=SEARCH_MAX_AGE):
+        self.max_items = max_items
+        self.max_age = max_age
+        self.documents = {}
+        # Documents by id; postings refer to documents by id, which are
+        # cheaper than keys to hash and compare
+        self.by_id = {}
+        self.next_id = 0
+        # Heap of (timestamp, document key) for eviction; entries of removed
+        # or replaced documents are skipped when they come up
+        self.by_time = []
+        # term -> {document id: weight}
+        self.postings = {}
+        # term -> [(-weight, -timestamp, document id)], best first
+        self.ranked = {}
+        # Every indexed term in order, for prefix lookups
+        self.vocabulary = []
+        self.total_length = 0
+        self.deferred = False
+        self.loading = False
+        # Items added while the index is warmed up, indexed once it is done
+        self.pending = []
+
+    def __len__(self):
+        return len(self.documents)
+
+    @property
+    def ready(self):
+        # Postings are unsorted while a bulk load is running
+        return not self.deferred and not self.loading
+
+    @contextmanager
+    def bulk(self):
+        """
+        Add many documents at once, weighting and sorting the postings once at
+        the end instead of on every insert. Postings are empty until then.
+        """
+        self.deferred = True
+        try:
+            yield self
+        finally:
+            for _ in self.finish_bulk():
+                pass
+
+    def finish_bulk(self):
+        """
+        Weight and sort the postings of a bulk load, yielding now and then so
+        an async caller can let other work run in between.
+        """
+        yield from self.reweight_steps()
+        self.vocabulary.sort()
+        self.deferred = False
+
+    def weight(self, frequency, length):
+        average_length = self.total_length / len(self.documents) if self.documents else length
+        return frequency * (K1 + 1) / (
+            frequency + K1 * (1 - B + B * length / (average_length or 1))
+        )
+
+    def reweight(self):
+        """
+        Recompute every posting's weight with the current average document
+        length and rebuild the sorted postings.
+        """
+        for _ in self.reweight_steps():
+            pass
+
+    def reweight_steps(self, chunk=WEIGHT_CHUNK):
+        # reweight() in steps of about `chunk` postings weighted or sorted;
+        # the index must not change until the generator is exhausted
+        average_length = (self.total_length / len(self.documents) if self.documents else 0) or 1
+        ranked = {term: [] for term in self.postings}
+        done = 0
+        for id, document in self.by_id.items():
+            # weight() with the length part worked out once per document
+            norm = K1 * (1 - B + B * document.length / average_length)
+            timestamp = -document.timestamp
+            for term, frequency in document.terms.items():
+                weight = frequency * (K1 + 1) / (frequency + norm)
+                self.postings[term][id] = weight
+                ranked[term].append((-weight, timestamp, id))
+            done += len(document.terms)
+            if done >= chunk:
+                done = 0
+                yield
+        for entries in ranked.values():
+            entries.sort()
+            done += len(entries)
+            if done >= chunk:
+                done = 0
+                yield
+        self.ranked = ranked
+
+    def add(self, source, item):
+        if self.loading:
+            self.pending.append((source, item))
+            return
+        self.insert(source, item)
+
+    def insert(self, source, item):
+        id_field = ITEM_ID_FIELDS.get(source)
+        if id_field is None or item.get(id_field) is None:
+            return
+        key = (source, item[id_field])
+        self.remove(key)
+        id = self.next_id
+        self.next_id += 1
+
+        terms = Counter()
+        for field, field_weight in TEXT_FIELDS[source]:
+            for token in tokenize(item.get(field) or ""):
+                terms[token] += field_weight
+        length = sum(terms.values())
+        timestamp = item.get("published") or item.get("message_date") or time.time()
+
+        for term, frequency in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self.ranked[term] = []
+                if self.deferred:
+                    self.vocabulary.append(term)
+                else:
+                    insort(self.vocabulary, term)
+            if self.deferred:
+                # Weighted and ranked once the bulk load is done
+                postings[id] = 0.0
+            else:
+                weight = self.weight(frequency, length)
+                postings[id] = weight
+                insort(self.ranked[term], (-weight, -timestamp, id))
+        document = Document(id, key, source, timestamp, item, dict(terms), length)
+        self.documents[key] = self.by_id[id] = document
+        heapq.heappush(self.by_time, (timestamp, key))
+        self.total_length += length
+        self.evict()
+
+    def remove(self, key):
+        document = self.documents.pop(key, None)
+        if document is None:
+            return
+        del self.by_id[document.id]
+        for term in document.terms:
+            postings = self.postings[term]
+            weight = postings.pop(document.id)
+            if not self.deferred:
+                ranked = self.ranked[term]
+                del ranked[bisect_left(ranked, (-weight, -document.timestamp, document.id))]
+            if not postings:
+                del self.postings[term]
+                del self.ranked[term]
+                if self.deferred:
+                    self.vocabulary.remove(term)
+                else:
+                    del self.vocabulary[bisect_left(self.vocabulary, term)]
+        self.total_length -= document.length
+
+    def evict(self):
+        oldest = time.time() - self.max_age
+        while self.by_time:
+            timestamp, key = self.by_time[0]
+            document = self.documents.get(key)
+            if document is not None and document.timestamp == timestamp:
+                if len(self.documents) <= self.max_items and timestamp >= oldest:
+                    break
+                self.remove(key)
+            heapq.heappop(self.by_time)
+        # Replaced documents leave entries behind; drop them once they pile up
+        if len(self.by_time) > 2 * len(self.documents) + 1024:
+            self.by_time = [(document.timestamp, key) for key, document in self.documents.items()]
+            heapq.heapify(self.by_time)
+
+    def expand(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        terms = []
+        for term in self.vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        if len(terms) > MAX_PREFIX_TERMS:
+            terms = heapq.nlargest(MAX_PREFIX_TERMS, terms, key=lambda term: len(self.postings[term]))
+        return terms
+
+    def parse(self, query):
+        """
+        Turn `query` into clauses, each the list of indexed terms one query
+        word may match.
+        """
+        words = query.lower().split()
+        clauses = []
+        for position, word in enumerate(words):
+            prefix = word.endswith("*") or position == len(words) - 1
+            tokens = tokenize(word)
+            for index, token in enumerate(tokens):
+                if prefix and index == len(tokens) - 1:
+                    clauses.append(self.expand(token))
+                else:
+                    clauses.append([token] if token in self.postings else [])
+        return clauses
+
+    @staticmethod
+    def score(id, clauses):
+        # A document has to match every clause; within a clause only its
+        # best matching term counts, so prefix variants are not summed
+        total = 0.0
+        for terms in clauses:
+            best = 0.0
+            for idf, postings in terms:
+                weight = postings.get(id)
+                if weight is not None and idf * weight > best:
+                    best = idf * weight
+            if not best:
+                return None
+            total += best
+        return total
+
+    def search(self, query, source=None, limit=20):
+        """
+        Return up to `limit` (score, Document) pairs for `query`, best first.
+        """
+        clauses = self.parse(query)
+        if not clauses or not all(clauses):
+            return []
+        count = len(self.documents)
+
+        def idf(term):
+            matches = len(self.postings[term])
+            return math.log(1 + (count - matches + 0.5) / (matches + 0.5))
+
+        clauses = [[(idf(term), term) for term in clause] for clause in clauses]
+        # Rarest clause first, so documents missing a word are ruled out early
+        clauses.sort(key=lambda clause: sum(len(self.postings[term]) for _, term in clause))
+        scoring = [[(weight, self.postings[term]) for weight, term in clause] for clause in clauses]
+        # Membership tests against the single-term clauses a document read
+        # from clause i must also match
+        filters = [
+            [
+                terms[0][1].__contains__
+                for other, terms in enumerate(scoring)
+                if other != index and len(terms) == 1
+            ]
+            for index in range(len(clauses))
+        ]
+        # Per clause, a heap over its terms' lists of (-bound of the next
+        # posting, position, idf, ranked, next position, batch size)
+        lists = []
+        for clause in clauses:
+            heads = [
+                (weight * self.ranked[term][0][0], position, weight, self.ranked[term], 0, READ_BATCH)
+                for position, (weight, term) in enumerate(clause)
+            ]
+            heapq.heapify(heads)
+            lists.append(heads)
+        maxima = [-heads[0][0] for heads in lists]
+        id_of = itemgetter(2)
+        seen = set()
+        top = []
+
+        while True:
+            # The best score a document not read yet could still reach, and
+            # the clause whose next postings score best relative to its
+            # first: reading there lowers that bound the most
+            frontier = 0.0
+            chosen = None
+            for index, heads in enumerate(lists):
+                if not heads:
+                    continue
+                bound = -heads[0][0]
+                frontier += bound
+                rate = bound * bound / maxima[index]
+                if chosen is None or rate > best:
+                    chosen, best = index, rate
+            if chosen is None:
+                break
+            if len(top) == limit and top[0][0] >= frontier:
+                # An unread document only ties the last result if it reaches
+                # the bound in every clause, so it is no newer than the next
+                # posting of some list
+                if top[0][0] > frontier or top[0][1] > max(
+                    -head[3][head[4]][1] for heads in lists for head in heads
+                ):
+                    break
+
+            heads = lists[chosen]
+            _, position, weight, ranked, start, batch = heads[0]
+            end = start + batch
+            ids = map(id_of, ranked[start:end])
+            for contains in filters[chosen]:
+                ids = filter(contains, ids)
+            if source is not None:
+                ids = [id for id in ids if self.by_id[id].source == source]
+            ids = set(ids).difference(seen)
+            if len(ids) * 8 < batch:
+                batch = min(batch * 2, MAX_READ_BATCH)
+            if end < len(ranked):
+                heapq.heapreplace(heads, (weight * ranked[end][0], position, weight, ranked, end, batch))
+            else:
+                heapq.heappop(heads)
+
+            seen.update(ids)
+            for id in ids:
+                score = self.score(id, scoring)
+                if score is None:
+                    continue
+                result = (score, self.by_id[id].timestamp, id)
+                if len(top) < limit:
+                    heapq.heappush(top, result)
+                elif result > top[0]:
+                    heapq.heapreplace(top, result)
+
+        return [(score, self.by_id[id]) for score, _, id in sorted(top, reverse=True)]
+
+
+async def load_index(index, redis_client, page_size):
+    since = time.time() - index.max_age
+    cursor = None
+    index.deferred = True
+    try:
+        while True:
+            items, cursor, more = await query_items(
+                redis_client, since=since, cursor=cursor, limit=page_size
+            )
+            for position, entry in enumerate(items, 1):
+                index.insert(entry["source"], entry["item"])
+                if position % LOAD_CHUNK == 0:
+                    await asyncio.sleep(0)
+            if not more:
+                break
+    finally:
+        for _ in index.finish_bulk():
+            await asyncio.sleep(0)
+
+
+async def warm_index(index, redis_client, page_size=1000, retry_delay=5, max_retry_delay=60):
+    """
+    Fill `index` with the stored items that are still within its age bound,
+    retrying until the load succeeds. The load yields to the IOLoop every
+    LOAD_CHUNK items so clients keep being served meanwhile, but the index
+    is not ready for queries until it is done. Items added meanwhile are
+    indexed at the end.
+    """
+    index.loading = True
+    while True:
+        try:
+            await load_index(index, redis_client, page_size)
+            break
+        except Exception as e:
+            logger.error(f"Error warming search index, retrying in {retry_delay}s: {e}")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, max_retry_delay)
+    while index.pending:
+        pending, index.pending = index.pending, []
+        for position, (source, item) in enumerate(pending, 1):
+            index.insert(source, item)
+            if position % LOAD_CHUNK == 0:
+                await asyncio.sleep(0)
+    index.loading = False
+    logger.info(f"Search index warmed with {len(index)} items")
@@ -0,0 +1,159 @@
+# app/tornado_app/subscriber.py
+import os
+import random
+import socket
+import asyncio
+from collections import deque
+import redis.exceptions
+from tornado.ioloop import IOLoop
+from app.redis.redis_instance import get_async_redis_client
+from app.redis.transport import NOTIFICATION_CHANNEL, notification_channel
+from app.utils.logger import logger
+
+BACKLOG_SIZE = int(os.environ.get("NOTIFICATION_BACKLOG_SIZE", 20))
+NODE_ID = os.environ.get("TORNADO_NODE_ID", socket.gethostname())
+
+
+def source_channel(fields):
+    # Stream entries written before per-source channels map to the old channel
+    source = fields.get(b"source")
+    if source is None:
+        return NOTIFICATION_CHANNEL.encode("utf-8")
+    return notification_channel(source.decode("utf-8")).encode("utf-8")
+
+
+class RedisSubscriber:
+    """
+    Process-wide Redis pub/sub listener running as a coroutine on the IOLoop.
+    Every message is handed to `on_message` as soon as it arrives; if Redis
+    goes away the subscription is re-established with exponential backoff.
+    The most recent messages are kept in `backlog` for newly connected clients.
+    With `pattern` the channel is a glob subscribed to with PSUBSCRIBE.
+    """
+
+    def __init__(
+        self,
+        channel,
+        on_message,
+        backlog_size=BACKLOG_SIZE,
+        min_backoff=0.5,
+        max_backoff=30.0,
+        pattern=False,
+        node_id=NODE_ID,
+    ):
+        self.channel = channel
+        self.on_message = on_message
+        self.pattern = pattern
+        # Identifies this process; set before start() when several processes
+        # share a host
+        self.node_id = node_id
+        self.backlog = deque(maxlen=backlog_size)
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.backoff = min_backoff
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        IOLoop.current().spawn_callback(self.run)
+
+    def stop(self):
+        self.running = False
+
+    async def run(self):
+        while self.running:
+            try:
+                await self.consume()
+            except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError) as e:
+                delay = self.backoff + random.uniform(0, self.backoff)
+                logger.error(
+                    f"Redis subscription to {self.channel} lost: {e}. Reconnecting in {delay:.1f} seconds..."
+                )
+                await asyncio.sleep(delay)
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+
+    async def consume(self):
+        pubsub = get_async_redis_client().pubsub(ignore_subscribe_messages=True)
+        try:
+            if self.pattern:
+                await pubsub.psubscribe(self.channel)
+            else:
+                await pubsub.subscribe(self.channel)
+            logger.info(f"Subscribed to Redis channel: {self.channel}")
+            self.backoff = self.min_backoff
+            async for message in pubsub.listen():
+                if not self.running:
+                    break
+                if message["type"] in ("message", "pmessage"):
+                    self.dispatch(message["channel"], message["data"])
+        finally:
+            try:
+                await pubsub.close()
+            except Exception as e:
+                logger.warning(f"Error closing Redis pubsub: {e}")
+
+    def dispatch(self, channel, data):
+        self.backlog.append((channel, data))
+        try:
+            self.on_message(channel, data)
+        except Exception as e:
+            logger.exception(f"Error handling message from {self.channel}: {e}")
+
+    def recent(self):
+        return list(self.backlog)
+
+
+class RedisStreamSubscriber(RedisSubscriber):
+    """
+    Durable variant reading a Redis Stream by ID. The last delivered ID is
+    persisted per node so a restarted process resumes where it left off, and
+    the backlog is preloaded from the tail of the stream. Entries are handed
+    on under the same per-source channel names the pub/sub transport uses.
+    """
+
+    def __init__(self, stream, on_message, batch_size=100, block_ms=5000, **kwargs):
+        super().__init__(stream, on_message, **kwargs)
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.last_id = None
+
+    @property
+    def cursor_key(self):
+        return f"stream_cursor:{self.channel}:{self.node_id}"
+
+    async def consume(self):
+        client = get_async_redis_client()
+        if self.last_id is None:
+            await self.restore(client)
+        logger.info(f"Reading Redis stream {self.channel} from ID {self.last_id}")
+        self.backoff = self.min_backoff
+        while self.running:
+            response = await client.xread(
+                {self.channel: self.last_id}, count=self.batch_size, block=self.block_ms
+            )
+            if not response:
+                continue
+            for stream, entries in response:
+                for entry_id, fields in entries:
+                    self.last_id = entry_id
+                    self.dispatch(source_channel(fields), fields[b"data"])
+            await client.set(self.cursor_key, self.last_id)
+
+    async def restore(self, client):
+        # Entries after a saved cursor are replayed by xread, so the backlog
+        # is only preloaded up to it
+        saved = await client.get(self.cursor_key)
+        entries = await client.xrevrange(
+            self.channel, max=saved or "+", count=self.backlog.maxlen
+        )
+        for entry_id, fields in reversed(entries):
+            self.backlog.append((source_channel(fields), fields[b"data"]))
+
+        if saved:
+            self.last_id = saved
+        elif entries:
+            self.last_id = entries[0][0]
+        else:
+            self.last_id = "0-0"
@@ -0,0 +1,82 @@
+# app/tornado_app/topics.py
+from collections import defaultdict
+
+# Topic kinds a client can subscribe to, e.g. "source:news", "project:cardano",
+# "organization:iohk" or "keyword:plutus"
+TOPIC_KINDS = ("source", "project", "organization", "keyword")
+
+
+def parse_topic(topic):
+    """
+    Normalize a "kind:value" topic string, or return None if it is invalid.
+    """
+    kind, _, value = str(topic).partition(":")
+    kind, value = kind.strip().lower(), value.strip().lower()
+    if kind not in TOPIC_KINDS or not value:
+        return None
+    return f"{kind}:{value}"
+
+
+def item_topics(source, item):
+    """
+    Topics an item published by `source` ("news", "discord" or "youtube")
+    belongs to.
+    """
+    topics = {f"source:{source}"} if source else set()
+    if item.get("message_project"):
+        topics.add(f"project:{item['message_project'].lower()}")
+    if item.get("organization"):
+        topics.add(f"organization:{item['organization'].lower()}")
+    if item.get("channel_title"):
+        topics.add(f"organization:{item['channel_title'].lower()}")
+    for keyword in item.get("keywords") or ():
+        topics.add(f"keyword:{keyword.lower()}")
+    return topics
+
+
+class TopicIndex:
+    """
+    Topic -> subscribed clients index. A client that has not subscribed to
+    anything receives every item, as before topics existed.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.topics = defaultdict(set)
+
+    def subscribe(self, client, topics):
+        for topic in topics:
+            self.subscribers[topic].add(client)
+            self.topics[client].add(topic)
+
+    def unsubscribe(self, client, topics):
+        for topic in topics:
+            self.topics[client].discard(topic)
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self.subscribers[topic]
+        if not self.topics[client]:
+            del self.topics[client]
+
+    def remove(self, client):
+        self.unsubscribe(client, list(self.topics.get(client, ())))
+
+    def is_filtered(self, client):
+        return client in self.topics
+
+    def subscriptions(self, client):
+        return sorted(self.topics.get(client, ()))
+
+    def match(self, topics):
+        """
+        Clients subscribed to any of `topics`.
+        """
+        clients = set()
+        for topic in topics:
+            clients |= self.subscribers.get(topic, set())
+        return clients
+
+    def stats(self):
+        return {topic: len(clients) for topic, clients in self.subscribers.items()}
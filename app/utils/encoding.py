@@ -0,0 +1,46 @@
+"""
+dumps() / loads() for everything published to Redis or sent to clients.
+Uses orjson when it is installed and falls back to the json module.
+packb() is the MessagePack encoding offered to WebSocket clients as binary
+frames; it needs the optional msgpack package.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+def default(obj):
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """
+    Serialize `obj` to UTF-8 encoded JSON bytes. Records are encoded field by
+    field in declaration order.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default)
+    return json.dumps(obj, default=default, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def packb(obj):
+    if msgpack is None:
+        raise RuntimeError("MessagePack encoding needs the msgpack package")
+    return msgpack.packb(obj, default=default)
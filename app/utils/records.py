@@ -0,0 +1,139 @@
+"""
+Slotted record types for the items produced by the news, Discord and YouTube
+sources, plus the timestamp parsing shared by their normalization code.
+Field names match the JSON keys clients already receive.
+"""
+
+import calendar
+from datetime import datetime
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+
+def struct_timestamp(value) -> Optional[int]:
+    try:
+        return calendar.timegm(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def iso_timestamp(value) -> Optional[int]:
+    try:
+        # fromisoformat only learned to read a trailing "Z" in Python 3.11
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def rfc822_timestamp(value) -> Optional[int]:
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def entry_timestamp(entry) -> Optional[int]:
+    """
+    Timestamp of a feedparser entry. The structured *_parsed fields are used
+    first since feedparser has already normalized them to UTC; the raw strings
+    are only parsed as a fallback. Returns None when no date is available.
+    """
+    for field in ("published_parsed", "updated_parsed", "created_parsed"):
+        if entry.get(field):
+            timestamp = struct_timestamp(entry[field])
+            if timestamp is not None:
+                return timestamp
+    for field in ("published", "updated", "created"):
+        value = entry.get(field)
+        if value:
+            timestamp = rfc822_timestamp(value) or iso_timestamp(value)
+            if timestamp is not None:
+                return timestamp
+    return None
+
+
+class Record:
+    __slots__ = ()
+    # Name of the field holding the item's epoch timestamp
+    time_field = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @property
+    def timestamp(self) -> Optional[int]:
+        return getattr(self, self.time_field)
+
+
+@dataclass
+class Article(Record):
+    __slots__ = (
+        "organization",
+        "title",
+        "link",
+        "description",
+        "published",
+        "author",
+        "image",
+        "keywords",
+        "story_id",
+        "alternates",
+    )
+    time_field = "published"
+    organization: str
+    title: str
+    link: str
+    description: str
+    published: Optional[int]
+    author: str
+    image: str
+    keywords: List[str]
+    # Near-duplicate cluster this article represents, and the same story as
+    # reported by other feeds
+    story_id: Optional[str]
+    alternates: List[Dict[str, Any]]
+
+
+@dataclass
+class Message(Record):
+    __slots__ = (
+        "message_id",
+        "message_project",
+        "message_text",
+        "message_author",
+        "message_channel_id",
+        "message_server_id",
+        "message_date",
+        "message_attachments",
+    )
+    time_field = "message_date"
+    message_id: str
+    message_project: str
+    message_text: str
+    message_author: Optional[str]
+    message_channel_id: str
+    message_server_id: str
+    message_date: Optional[int]
+    message_attachments: List[str]
+
+
+@dataclass
+class Video(Record):
+    __slots__ = (
+        "id",
+        "title",
+        "full_description",
+        "channel_title",
+        "published_at",
+        "published",
+        "urls",
+    )
+    time_field = "published"
+    id: str
+    title: str
+    full_description: str
+    channel_title: str
+    published_at: str
+    published: Optional[int]
+    urls: Dict[str, str]
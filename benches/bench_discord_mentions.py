@@ -0,0 +1,66 @@
+# benches/bench_discord_mentions.py
+"""
+Render a long announcement full of mentions with the previous
+pattern-per-kind replacement loop and with the single-pass renderer.
+"""
+
+import re
+import time
+from app.celery_app.tasks.discord_mentions import (
+    MENTION_PATTERN,
+    collect_mentions,
+    emoji_url,
+    render_mentions,
+)
+from app.utils.logger import logger
+
+
+if __name__ == "__main__":
+    ids = [str(800000000000000000 + i) for i in range(40)]
+    users = {user_id: f"user{index}" for index, user_id in enumerate(ids)}
+    channels = {channel_id: f"channel{index}" for index, channel_id in enumerate(ids)}
+    roles = {role_id: f"role{index}" for index, role_id in enumerate(ids)}
+    # A long announcement: a few hundred lines with dozens of mentions of each kind
+    text = "\n".join(
+        f"Update {i}: thanks <@{ids[i % 40]}> and <@&{ids[(i + 1) % 40]}>, "
+        f"see <#{ids[(i + 2) % 40]}> <:ada:{ids[(i + 3) % 40]}> for details."
+        for i in range(300)
+    )
+
+    def legacy(text):
+        patterns = [
+            re.compile(r"<@&(\d+)>"),
+            re.compile(r"<#(\d+)>"),
+            re.compile(r"<@(\d+)>"),
+            re.compile(r"<:[a-zA-Z0-9_]+:(\d+)>"),
+        ]
+        role_ids, channel_ids, user_ids, emoji_ids = [
+            [found for line in text.split("\n") for found in pattern.findall(line)]
+            for pattern in patterns
+        ]
+        for emoji_id in emoji_ids:
+            text = re.sub(patterns[3], f'<img src="{emoji_url(emoji_id)}" alt="emoji">', text)
+        for user_id in user_ids:
+            text = text.replace(f"<@{user_id}>", f"@{users[user_id]}")
+        for channel_id in channel_ids:
+            text = text.replace(f"<#{channel_id}>", f"#{channels[channel_id]}")
+        for role_id in role_ids:
+            text = text.replace(f"<@&{role_id}>", f"@{roles[role_id]}")
+        return text
+
+    runs = 20
+    started = time.perf_counter()
+    for _ in range(runs):
+        legacy(text)
+    legacy_time = (time.perf_counter() - started) / runs
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        collect_mentions(text)
+        render_mentions(text, users, channels, roles)
+    single_pass_time = (time.perf_counter() - started) / runs
+
+    logger.info(
+        f"{len(text)} chars, {len(MENTION_PATTERN.findall(text))} mentions: "
+        f"legacy {legacy_time * 1000:.2f}ms, single pass {single_pass_time * 1000:.2f}ms"
+    )
@@ -0,0 +1,70 @@
+# benches/bench_frames.py
+"""
+CPU and bytes per client of one broadcast to 1000 clients: uncompressed
+legacy frames (the production path before shared compression), deflate per
+connection as write_message does it, and shared deflate per format.
+"""
+
+import time
+import zlib
+from app.tornado_app.frames import Frame, available_formats
+from app.utils.encoding import dumps
+from app.utils.logger import logger
+
+
+if __name__ == "__main__":
+    clients = 1000
+    # A typical news delta: 20 articles with HTML-ish descriptions
+    payload = dumps(
+        [
+            {
+                "organization": "Cardano Foundation",
+                "title": f"Article {i}: \"Plutus\" update & roadmap",
+                "link": f"https://example.com/news/{i}",
+                "description": f"<p>Summary of update {i} with <a href=\"/x\">links</a></p>" * 4,
+                "published": 1714996800 + i,
+                "author": "Jane Doe",
+                "image": f"https://example.com/img/{i}.png",
+                "keywords": ["cardano", "plutus"],
+            }
+            for i in range(20)
+        ]
+    )
+
+    def uncompressed():
+        # What production sent before: one double-encoded frame per client,
+        # without compression
+        data = dumps({"message": payload.decode("utf-8")})
+        return len(data), len(data) * clients
+
+    def legacy():
+        # One double-encoded frame, deflated separately on every connection
+        # by its own persistent compressor, as write_message would
+        data = dumps({"message": payload.decode("utf-8")})
+        sent = 0
+        for _ in range(clients):
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS, 8)
+            sent += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+        return len(data), sent
+
+    def shared(frame_format):
+        frame = Frame(None, payload)
+        sent = 0
+        for _ in range(clients):
+            sent += len(frame.deflate(frame_format, 6, zlib.MAX_WBITS, 8)[0])
+        return len(frame.encode(frame_format)[0]), sent
+
+    def measure(name, build):
+        started = time.perf_counter()
+        size, sent = build()
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"{name}: frame {size} bytes, {sent / clients:.0f} bytes/client sent, "
+            f"{elapsed * 1000:.1f}ms CPU per broadcast to {clients} clients"
+        )
+
+    logger.info(f"Payload {len(payload)} bytes")
+    measure("legacy, uncompressed (previous production path)", uncompressed)
+    measure("legacy, per-connection deflate", legacy)
+    for frame_format in available_formats():
+        measure(f"{frame_format}, shared deflate", lambda: shared(frame_format))
@@ -0,0 +1,51 @@
+# benches/bench_matcher.py
+"""
+Match 10k synthetic entries against 126 keywords with one regex search per
+keyword and with the prefix-factored matcher.
+"""
+
+import re
+import time
+import random
+from app.celery_app.tasks.matcher import get_matcher
+from app.utils.logger import logger
+
+
+if __name__ == "__main__":
+    words = ["market", "price", "network", "update", "token", "wallet", "staking", "bitcoin"]
+    keywords = ["cardano", "hoskinson", "ada", "iohk", "iog", "$ada"] + [
+        f"project{i}" for i in range(120)
+    ]
+    # Roughly one entry in twenty mentions a keyword, as in the generic feeds
+    entries = [
+        (
+            " ".join(
+                random.choices(words, k=12)
+                + random.choices(keywords, k=1 if random.random() < 0.05 else 0)
+            ).title(),
+            " ".join(random.choices(words, k=60)),
+        )
+        for _ in range(10000)
+    ]
+
+    started = time.perf_counter()
+    baseline = 0
+    for title, description in entries:
+        if any(
+            re.search(r"\b" + re.escape(keyword.lower()) + r"\b", title.lower())
+            or re.search(r"\b" + re.escape(keyword.lower()) + r"\b", description.lower())
+            for keyword in keywords
+        ):
+            baseline += 1
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matcher = get_matcher(keywords)
+    matched = sum(1 for title, description in entries if matcher.matches(title, description))
+    matcher_time = time.perf_counter() - started
+
+    logger.info(
+        f"{len(entries)} entries x {len(keywords)} keywords: loop {loop_time:.3f}s "
+        f"({baseline} hits), matcher {matcher_time:.3f}s ({matched} hits), "
+        f"{loop_time / matcher_time:.1f}x faster"
+    )
@@ -0,0 +1,53 @@
+# benches/bench_parser_pool.py
+"""
+Parse 21 synthetic feeds of 200 entries inline and through the parser pool.
+"""
+
+import time
+import asyncio
+from app.celery_app.tasks.parser_pool import (
+    FEED_PARSER_POOL_KIND,
+    FEED_PARSER_POOL_SIZE,
+    parse_entries,
+    parse_feed,
+)
+from app.utils.logger import logger
+
+def make_benchmark_feed(items):
+    entries = "".join(
+        f"""
+        <item>
+            <title>Cardano news story number {i}</title>
+            <link>https://example.com/news/{i}</link>
+            <description><![CDATA[<p>Story {i} about ADA, staking and the ecosystem.</p>]]></description>
+            <pubDate>Mon, 06 May 2024 12:{i % 60:02d}:00 +0000</pubDate>
+            <author>Reporter {i}</author>
+        </item>"""
+        for i in range(items)
+    )
+    return (
+        '<?xml version="1.0"?><rss version="2.0"><channel><title>Bench</title>'
+        f"{entries}</channel></rss>"
+    ).encode("utf-8")
+
+
+async def benchmark_pool(feeds):
+    started = time.perf_counter()
+    for next_entries in asyncio.as_completed([parse_feed(feed) for feed in feeds]):
+        await next_entries
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    feeds = [make_benchmark_feed(200) for _ in range(21)]
+
+    started = time.perf_counter()
+    for feed in feeds:
+        parse_entries(feed)
+    inline = time.perf_counter() - started
+
+    pooled = asyncio.run(benchmark_pool(feeds))
+    logger.info(
+        f"Parsed {len(feeds)} feeds: inline {inline:.3f}s, "
+        f"{FEED_PARSER_POOL_KIND} pool of {FEED_PARSER_POOL_SIZE} {pooled:.3f}s"
+    )
@@ -0,0 +1,56 @@
+# benches/bench_records.py
+"""
+Memory per item and encoding time of 10k articles as dicts and as records.
+"""
+
+import sys
+import time
+import json
+import tracemalloc
+from app.utils.encoding import dumps
+from app.utils.records import Article
+from app.utils.logger import logger
+
+
+if __name__ == "__main__":
+    count = 10000
+
+    def make_dict(i):
+        return {
+            "organization": "coindesk.com",
+            "title": f"Cardano story {i}",
+            "link": f"https://coindesk.com/story/{i}",
+            "description": "ADA rallies as staking grows " * 4,
+            "published": 1714996800 + i,
+            "author": "Reporter",
+            "image": "no_image",
+            "keywords": ["cardano"],
+            "story_id": None,
+            "alternates": [],
+        }
+
+    def measure(build):
+        tracemalloc.start()
+        items = [build(i) for i in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return items, size
+
+    dicts, dict_size = measure(make_dict)
+    records, record_size = measure(lambda i: Article(**make_dict(i)))
+
+    started = time.perf_counter()
+    json.dumps(dicts)
+    json_time = time.perf_counter() - started
+    started = time.perf_counter()
+    dumps(records)
+    encode_time = time.perf_counter() - started
+
+    logger.info(
+        f"{count} articles: dict {dict_size / count:.0f} B/item "
+        f"(container {sys.getsizeof(dicts[0])} B), record {record_size / count:.0f} B/item "
+        f"(container {sys.getsizeof(records[0])} B)"
+    )
+    logger.info(
+        f"Encode: json.dumps(dicts) {json_time:.4f}s, dumps(records) {encode_time:.4f}s"
+    )
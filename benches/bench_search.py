@@ -0,0 +1,62 @@
+# benches/bench_search.py
+"""
+Index 100k synthetic items with Zipf-distributed words, then time
+incremental adds with eviction and a mix of queries.
+"""
+
+import time
+import random
+from app.tornado_app.search import SearchIndex
+from app.utils.logger import logger
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    stems = ("cardano", "plutus", "stake", "wallet", "token", "node", "pool", "vote", "hydra", "mithril")
+    words = [f"{stem}{suffix}" for stem in stems for suffix in ("", "s", "ing", "ed", "er")]
+    words += [f"word{i}" for i in range(20000)]
+    # Zipf-like word frequencies
+    cumulative = []
+    total = 0.0
+    for rank in range(len(words)):
+        total += 1 / (rank + 1)
+        cumulative.append(total)
+
+    def text(length):
+        return " ".join(random.choices(words, cum_weights=cumulative, k=length))
+
+    def make_item(i):
+        source = ("news", "discord", "youtube")[i % 3]
+        if source == "news":
+            item = {"link": f"https://example.com/{i}", "title": text(8), "description": text(40)}
+        elif source == "discord":
+            item = {"message_id": str(i), "message_text": text(30)}
+        else:
+            item = {"id": str(i), "title": text(8), "full_description": text(60)}
+        item["published" if source != "discord" else "message_date"] = 1714996800 + i
+        return source, item
+
+    items = [make_item(i) for i in range(101000)]
+    index = SearchIndex(max_items=100000, max_age=10**10)
+    started = time.perf_counter()
+    with index.bulk():
+        for source, item in items[:100000]:
+            index.add(source, item)
+    logger.info(
+        f"Bulk indexed {len(index)} items, {len(index.postings)} terms "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    started = time.perf_counter()
+    for source, item in items[100000:]:
+        index.add(source, item)
+    elapsed = (time.perf_counter() - started) / 1000
+    logger.info(f"Incremental add with eviction: {elapsed * 1000:.3f}ms per item")
+
+    queries = ("cardano", "plutus stake", "hydra nod", "wallet token pool", "word5 word9", "word123", "mith")
+    for query in queries:
+        runs = 20
+        started = time.perf_counter()
+        for _ in range(runs):
+            results = index.search(query)
+        elapsed = (time.perf_counter() - started) / runs
+        logger.info(f"{query!r}: {len(results)} results in {elapsed * 1000:.2f}ms")
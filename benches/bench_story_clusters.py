@@ -0,0 +1,80 @@
+# benches/bench_story_clusters.py
+"""
+Fingerprint 2000 synthetic articles and 200 rewrites, then look the
+rewrites up the way StoryClusters does: in their bands, reading at most
+BAND_CANDIDATES of the newest entries per band. Reports recall, candidates
+compared per lookup and false matches.
+"""
+
+import time
+import random
+from app.celery_app.tasks.story_clusters import (
+    BAND_CANDIDATES,
+    MAX_DISTANCE,
+    bands,
+    distance,
+    features,
+    simhash,
+)
+from app.utils.records import Article
+from app.utils.logger import logger
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    vocabulary = [f"word{i}" for i in range(5000)]
+
+    def make_article(i, title, description, organization="coindesk.com"):
+        return Article(
+            organization=organization,
+            title=title,
+            link=f"https://{organization}/story/{i}",
+            description=description,
+            published=1714996800 + i,
+            author="",
+            image="no_image",
+            keywords=[],
+            story_id=None,
+            alternates=[],
+        )
+
+    base = [
+        (" ".join(random.choices(vocabulary, k=10)), " ".join(random.choices(vocabulary, k=60)))
+        for _ in range(2000)
+    ]
+    # A rewrite of a story: a couple of words changed or dropped
+    copies = []
+    for i, (title, description) in enumerate(base[:200]):
+        words = description.split()
+        words[random.randrange(len(words))] = random.choice(vocabulary)
+        copies.append(make_article(10000 + i, title, " ".join(words[:-1]), "cointelegraph.com"))
+    originals = [make_article(i, title, description) for i, (title, description) in enumerate(base)]
+
+    started = time.perf_counter()
+    prints = [simhash(features(article)) for article in originals + copies]
+    elapsed = time.perf_counter() - started
+    # Band -> article indexes in insert order; a lookup reads the newest ones
+    index = {}
+    for i, fingerprint in enumerate(prints[: len(originals)]):
+        for band, value in enumerate(bands(fingerprint)):
+            index.setdefault((band, value), []).append(i)
+
+    found = compared = 0
+    for i, fingerprint in enumerate(prints[len(originals) :]):
+        candidates = set()
+        for band, value in enumerate(bands(fingerprint)):
+            candidates.update(index.get((band, value), [])[-BAND_CANDIDATES:])
+        compared += len(candidates)
+        if any(distance(fingerprint, prints[c]) <= MAX_DISTANCE for c in candidates if c == i):
+            found += 1
+    false_matches = sum(
+        1
+        for i in range(len(originals))
+        for j in range(i + 1, min(i + 50, len(originals)))
+        if distance(prints[i], prints[j]) <= MAX_DISTANCE
+    )
+    logger.info(
+        f"Fingerprinted {len(prints)} articles in {elapsed * 1000:.0f}ms; "
+        f"{found}/{len(copies)} rewrites matched, {compared / len(copies):.1f} candidates "
+        f"compared per lookup (of {len(originals)}), {false_matches} false matches"
+    )
@@ -0,0 +1,19 @@
+import os
+import pytest
+import redis
+
+# A database the tests may flush; point it elsewhere with TEST_REDIS_URL
+TEST_REDIS_URL = os.environ.get("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+@pytest.fixture
+def redis_client():
+    client = redis.Redis.from_url(TEST_REDIS_URL)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip(f"Redis is not reachable at {TEST_REDIS_URL}")
+    client.flushdb()
+    yield client
+    client.flushdb()
+    client.close()
@@ -0,0 +1,38 @@
+import asyncio
+from app.redis.cache import LRUCache, TieredCache
+
+
+class StubRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    async def run():
+        cache = TieredCache(StubRedis(), "discord:user", 60, LRUCache())
+        release = asyncio.Event()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await release.wait()
+            return {"name": "alice"}
+
+        first = asyncio.ensure_future(cache.get("1", loader))
+        second = asyncio.ensure_future(cache.get("1", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == {"name": "alice"}
+        assert first.cancelled()
+        assert calls == [1]
+        assert await cache.get("1", loader) == {"name": "alice"}
+
+    asyncio.run(run())
@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.redis.dedup import SeenStore
+from app.utils.records import Video
+
+
+def make_video(video_id, title="A video"):
+    return Video(
+        id=video_id,
+        title=title,
+        full_description="",
+        channel_title="Cardano",
+        published_at="2024-05-06T12:00:00Z",
+        published=1714996800,
+        urls={},
+    )
+
+
+def test_filter_new_reports_new_and_changed_items(redis_client):
+    store = SeenStore(redis_client, "youtube", "id")
+    assert store.filter_new([make_video("a"), make_video("b")]) == [make_video("a"), make_video("b")]
+    assert store.filter_new([make_video("a"), make_video("b")]) == []
+    assert store.filter_new([make_video("a", "Renamed"), make_video("b")]) == [make_video("a", "Renamed")]
+
+
+def test_full_snapshot_returns_every_item(redis_client):
+    store = SeenStore(redis_client, "youtube", "id")
+    store.filter_new([make_video("a")])
+    assert store.filter_new([make_video("a"), make_video("b")], full_snapshot=True) == [
+        make_video("a"),
+        make_video("b"),
+    ]
+
+
+def test_duplicates_within_a_call_are_reported_once(redis_client):
+    store = SeenStore(redis_client, "youtube", "id")
+    assert store.filter_new([make_video("a"), make_video("a", "Other")]) == [make_video("a")]
+
+
+def test_concurrent_callers_report_an_item_once(redis_client):
+    store = SeenStore(redis_client, "youtube", "id")
+    videos = [make_video(str(index)) for index in range(50)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        deltas = list(pool.map(lambda _: store.filter_new(videos), range(8)))
+    assert sorted(video.id for delta in deltas for video in delta) == sorted(
+        video.id for video in videos
+    )
@@ -0,0 +1,69 @@
+import asyncio
+import redis.asyncio
+from app.celery_app.tasks.discord_ratelimit import DiscordRateLimiter
+from tests.conftest import TEST_REDIS_URL
+
+CHANNEL = "https://discord.com/api/v10/channels/{}/messages"
+
+
+def run_limiters(scenario, count=2, global_rate=1000):
+    # Each limiter stands for a channel task, possibly in another worker
+    async def run():
+        client = redis.asyncio.Redis.from_url(TEST_REDIS_URL)
+        try:
+            limiters = [DiscordRateLimiter(client, global_rate=global_rate) for _ in range(count)]
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await scenario(*limiters)
+            return loop.time() - started
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+def headers(remaining, reset_after, bucket="abc"):
+    return {
+        "X-RateLimit-Bucket": bucket,
+        "X-RateLimit-Limit": "5",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset-After": str(reset_after),
+    }
+
+
+def test_an_exhausted_bucket_blocks_other_tasks(redis_client):
+    async def scenario(first, second):
+        url = CHANNEL.format(1)
+        await first.acquire(url)
+        await first.update(url, 200, headers(1, 0.5))
+        await second.acquire(url)
+        await second.acquire(url)
+
+    assert run_limiters(scenario) >= 0.45
+
+
+def test_major_parameters_are_limited_separately(redis_client):
+    async def scenario(first, second):
+        await first.acquire(CHANNEL.format(1))
+        await first.update(CHANNEL.format(1), 200, headers(0, 5))
+        await second.acquire(CHANNEL.format(2))
+
+    assert run_limiters(scenario) < 1
+
+
+def test_global_limit_is_shared(redis_client):
+    async def scenario(first, second):
+        for index in range(3):
+            await first.acquire(CHANNEL.format(index))
+            await second.acquire(CHANNEL.format(index + 10))
+
+    # Six requests at ten per second, whichever task sends them
+    assert run_limiters(scenario, global_rate=10) >= 0.45
+
+
+def test_global_429_pauses_every_task(redis_client):
+    async def scenario(first, second):
+        await first.update(CHANNEL.format(1), 429, {"Retry-After": "0.5", "X-RateLimit-Global": "true"})
+        await second.acquire(CHANNEL.format(2))
+
+    assert run_limiters(scenario) >= 0.45
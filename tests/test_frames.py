@@ -0,0 +1,75 @@
+import asyncio
+import tornado.web
+from tornado.httpclient import HTTPRequest
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+from tornado.websocket import WebSocketClientConnection, websocket_connect
+from app.tornado_app.frames import Frame
+from app.tornado_app.handlers.news_handler import NewsHandler
+from app.utils.encoding import dumps, loads
+
+
+class NoContextTakeoverClient(WebSocketClientConnection):
+    # Tornado's client always offers "permessage-deflate;
+    # client_max_window_bits"; the handshake goes out once the TCP connection
+    # is up, so server_no_context_takeover can still be added to the offer.
+    # Tornado's header parser drops parameters without a value, hence "=1"
+    def __init__(self, request, **kwargs):
+        super().__init__(request, **kwargs)
+        request.headers["Sec-WebSocket-Extensions"] += "; server_no_context_takeover=1"
+
+
+async def connect(url, no_context_takeover):
+    if not no_context_takeover:
+        return await websocket_connect(url, compression_options={})
+    request = HTTPRequest(url, connect_timeout=5, request_timeout=5)
+    return await NoContextTakeoverClient(request, compression_options={}).connect_future
+
+
+def receive_shared_frames(no_context_takeover):
+    async def run():
+        sock, port = bind_unused_port()
+        server = HTTPServer(tornado.web.Application([(r"/ws", NewsHandler)]))
+        server.add_sockets([sock])
+        clients = []
+        try:
+            for _ in range(2):
+                url = f"ws://127.0.0.1:{port}/ws?format=json"
+                clients.append(await connect(url, no_context_takeover))
+            while len(NewsHandler.clients) < 2:
+                await asyncio.sleep(0.01)
+            handlers = list(NewsHandler.clients)
+            assert all(handler.shared_deflate_params(handler.ws_connection) for handler in handlers)
+
+            payloads = [{"title": f"Cardano node release {n} " * 20} for n in range(3)]
+            frames = [Frame(None, dumps(payload)) for payload in payloads]
+            for frame in frames:
+                for handler in handlers:
+                    handler.enqueue(frame)
+            received = [[loads(await client.read_message()) for _ in frames] for client in clients]
+            extensions = [client.headers["Sec-WebSocket-Extensions"] for client in clients]
+            # One compressed copy per frame, written to both clients
+            deflated = [[key for key in frame.encoded if isinstance(key, tuple)] for frame in frames]
+            return payloads, received, extensions, deflated
+        finally:
+            for client in clients:
+                client.close()
+            while NewsHandler.clients:
+                await asyncio.sleep(0.01)
+            server.stop()
+
+    return asyncio.run(run())
+
+
+def test_clients_decode_a_shared_precompressed_frame():
+    payloads, received, extensions, deflated = receive_shared_frames(False)
+    assert received == [[{"message": payload} for payload in payloads]] * 2
+    assert all("server_no_context_takeover" not in extension for extension in extensions)
+    assert all(len(keys) == 1 for keys in deflated)
+
+
+def test_clients_decode_a_shared_precompressed_frame_without_context_takeover():
+    payloads, received, extensions, deflated = receive_shared_frames(True)
+    assert received == [[{"message": payload} for payload in payloads]] * 2
+    assert all("server_no_context_takeover" in extension for extension in extensions)
+    assert all(len(keys) == 1 for keys in deflated)
@@ -0,0 +1,71 @@
+import time
+import asyncio
+import pytest
+import redis.asyncio
+from app.redis.item_store import ItemStore, index_key, item_key, query_items
+from app.utils.records import Article
+from tests.conftest import TEST_REDIS_URL
+
+
+def make_article(index):
+    return Article(
+        organization="example.com",
+        title=f"Story {index}",
+        link=f"https://example.com/{index}",
+        description="",
+        published=int(time.time()) - 1000 + index,
+        author="",
+        image="no_image",
+        keywords=[],
+        story_id=None,
+        alternates=[],
+    )
+
+
+@pytest.fixture
+def query(redis_client):
+    def run(**kwargs):
+        async def main():
+            client = redis.asyncio.Redis.from_url(TEST_REDIS_URL)
+            try:
+                return await query_items(client, **kwargs)
+            finally:
+                await client.close()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def titles(items):
+    return [entry["item"]["title"] for entry in items]
+
+
+def test_pages_follow_the_cursor(redis_client, query):
+    ItemStore(redis_client).save("news", [make_article(index) for index in range(10)])
+    items, cursor, more = query(since=0, limit=4)
+    assert titles(items) == [f"Story {index}" for index in range(4)] and more
+    items, cursor, more = query(cursor=cursor, limit=4)
+    assert titles(items) == [f"Story {index}" for index in range(4, 8)] and more
+    items, cursor, more = query(cursor=cursor, limit=4)
+    assert titles(items) == ["Story 8", "Story 9"] and not more
+
+
+def test_latest_page_holds_the_newest_items(redis_client, query):
+    ItemStore(redis_client).save("news", [make_article(index) for index in range(10)])
+    items, _, more = query(limit=3)
+    assert titles(items) == ["Story 7", "Story 8", "Story 9"] and not more
+
+
+def test_expired_items_are_skipped_and_trimmed(redis_client, query):
+    articles = [make_article(index) for index in range(12)]
+    ItemStore(redis_client).save("news", articles)
+    expired = [article for index, article in enumerate(articles) if index % 3 == 0]
+    redis_client.delete(*(item_key("news", article.link) for article in expired))
+
+    items, cursor, more = query(since=0, limit=5)
+    assert titles(items) == ["Story 1", "Story 2", "Story 4", "Story 5", "Story 7"] and more
+    items, cursor, more = query(cursor=cursor, limit=5)
+    assert titles(items) == ["Story 8", "Story 10", "Story 11"] and not more
+    assert titles(query(limit=3)[0]) == ["Story 8", "Story 10", "Story 11"]
+    assert redis_client.zcard(index_key()) == len(articles) - len(expired)
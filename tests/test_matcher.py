@@ -0,0 +1,21 @@
+from app.celery_app.tasks.matcher import KeywordMatcher, get_matcher, trie_pattern
+
+
+def test_trie_pattern_factors_common_prefixes():
+    assert trie_pattern(["ada", "adam", "iog", "iohk"]) == "(?:ada(?:m)?|io(?:g|hk))"
+
+
+def test_matches_whole_words_case_insensitively():
+    matcher = get_matcher(["cardano", "ada", "iohk"])
+    assert matcher.matches("Cardano and IOHK", "adapters are not ada") == {"cardano", "iohk", "ada"}
+    assert matcher.matches("Canada", "adaptive") == set()
+
+
+def test_longer_keyword_wins_over_its_prefix():
+    assert KeywordMatcher(["ada", "adam"]).matches("Adam said") == {"adam"}
+
+
+def test_no_keywords_matches_nothing():
+    for keywords in ([], [""]):
+        matcher = KeywordMatcher(keywords)
+        assert matcher.matches("any title", "any description") == set()
@@ -0,0 +1,31 @@
+from app.tornado_app.frames import Frame
+from app.tornado_app.outbound import COALESCE, OutboundQueue
+from app.utils.encoding import dumps, loads
+
+CHANNEL = b"notification_channel:news"
+
+
+def news(link, title):
+    return {"link": link, "title": title}
+
+
+def test_coalescing_merges_the_items_of_both_frames():
+    queue = OutboundQueue(maxsize=2, policy=COALESCE)
+    queue.put(Frame(CHANNEL, dumps([news("a", "A"), news("b", "B")])))
+    queue.put(Frame(None, b"{}", wrap=False))
+    assert queue.put(Frame(CHANNEL, dumps(news("b", "B updated"))))
+    assert queue.put(Frame(CHANNEL, dumps([news("c", "C")])))
+
+    reply, merged = queue.frames
+    assert reply.key is None
+    assert loads(merged.payload) == [news("a", "A"), news("b", "B updated"), news("c", "C")]
+    assert queue.coalesced == 2
+    assert queue.dropped == 0
+
+
+def test_frames_without_a_match_drop_the_oldest():
+    queue = OutboundQueue(maxsize=1, policy=COALESCE)
+    queue.put(Frame(CHANNEL, dumps([news("a", "A")])))
+    queue.put(Frame(b"notification_channel:discord", dumps([{"message_id": "1"}])))
+    assert [frame.key for frame in queue.frames] == [b"notification_channel:discord"]
+    assert queue.dropped == 1
@@ -0,0 +1,27 @@
+import asyncio
+import multiprocessing
+
+FEED = (
+    b'<?xml version="1.0"?><rss version="2.0"><channel><title>Test</title>'
+    b"<item><title>Cardano node release</title><link>https://example.com/1</link></item>"
+    b"</channel></rss>"
+)
+
+
+def parse_in_daemon(results):
+    from app.celery_app.tasks import parser_pool
+
+    entries = asyncio.run(parser_pool.parse_feed(FEED))
+    results.put((type(parser_pool.get_executor()).__name__, [entry.title for entry in entries]))
+    parser_pool.get_executor().shutdown()
+
+
+def test_daemonic_workers_parse_in_a_process_pool():
+    # Like a Celery prefork child
+    results = multiprocessing.Queue()
+    worker = multiprocessing.Process(target=parse_in_daemon, args=(results,), daemon=True)
+    worker.start()
+    kind, titles = results.get(timeout=30)
+    worker.join(30)
+    assert kind == "ProcessPool"
+    assert titles == ["Cardano node release"]
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.celery_app.scheduler import POLL_BOUNDS, AdaptiveScheduler
+
+SOURCES = [f"news:https://example.com/{index}" for index in range(20)]
+
+
+def test_due_sources_are_claimed_once(redis_client):
+    scheduler = AdaptiveScheduler(redis_client)
+    scheduler.register(SOURCES)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        claims = list(pool.map(lambda _: scheduler.claim_due(SOURCES), range(8)))
+    assert sorted(source_id for claim in claims for source_id in claim) == sorted(SOURCES)
+    assert scheduler.claim_due(SOURCES) == []
+
+
+def test_claim_ignores_unknown_sources(redis_client):
+    scheduler = AdaptiveScheduler(redis_client)
+    scheduler.register(["news:stale"])
+    assert scheduler.claim_due(SOURCES) == []
+
+
+def test_failures_back_off_without_touching_the_rate(redis_client):
+    scheduler = AdaptiveScheduler(redis_client)
+    source_id = SOURCES[0]
+    low, _, high = POLL_BOUNDS["news"]
+    scheduler.record_poll(source_id, 3, [1714996800, 1714997400, 1714998000])
+    rate = scheduler.load_stats(source_id)["rate"]
+
+    intervals = []
+    for _ in range(8):
+        scheduler.record_failure(source_id)
+        intervals.append(scheduler.load_stats(source_id)["interval"])
+    assert intervals[:3] == [low, low * 2, low * 4]
+    assert intervals[-1] == high
+    assert scheduler.load_stats(source_id)["rate"] == rate
+
+    scheduler.record_poll(source_id, 0)
+    assert scheduler.load_stats(source_id)["failures"] == 0
@@ -0,0 +1,157 @@
+import math
+import time
+import random
+import asyncio
+from app.tornado_app import search
+from app.tornado_app.search import SearchIndex, tokenize, warm_index
+
+
+def news(index, title, description="", published=None):
+    return {
+        "link": f"https://example.com/{index}",
+        "title": title,
+        "description": description,
+        "published": published or time.time() - 1000 + index,
+    }
+
+
+def keys(results):
+    return [document.key[1] for _, document in results]
+
+
+def test_tokenize_drops_markup_and_stopwords():
+    assert tokenize("<p>The Cardano <b>node</b> is up</p>") == ["cardano", "node", "up"]
+
+
+def test_every_word_must_match_and_last_word_is_a_prefix():
+    index = SearchIndex()
+    index.add("news", news(1, "Cardano node release"))
+    index.add("news", news(2, "Cardano wallet update"))
+    index.add("news", news(3, "Bitcoin node release"))
+    assert keys(index.search("cardano node")) == ["https://example.com/1"]
+    assert sorted(keys(index.search("cardano wall"))) == ["https://example.com/2"]
+    assert index.search("cardano missing") == []
+
+
+def test_ranks_by_term_frequency_and_field_weight():
+    index = SearchIndex()
+    index.add("news", news(1, "Markets today", "hydra mentioned once among other words here"))
+    index.add("news", news(2, "Hydra scaling", "hydra heads explained"))
+    index.add("news", news(3, "Weekly roundup", "hydra"))
+    assert keys(index.search("hydra"))[0] == "https://example.com/2"
+
+
+def exhaustive(index, query, limit):
+    count = len(index)
+    scoring = [
+        [
+            (
+                math.log(1 + (count - len(index.postings[term]) + 0.5) / (len(index.postings[term]) + 0.5)),
+                index.postings[term],
+            )
+            for term in clause
+        ]
+        for clause in index.parse(query)
+    ]
+    ranked = []
+    for id, document in index.by_id.items():
+        score = index.score(id, scoring)
+        if score is not None:
+            ranked.append((score, document.timestamp, id))
+    return [index.by_id[id].key[1] for _, _, id in sorted(ranked, reverse=True)[:limit]]
+
+
+def test_top_results_match_an_exhaustive_ranking():
+    random.seed(7)
+    words = ["stake", "pool", "vote", "token", "wallet", "node", "staking", "tokens"]
+    index = SearchIndex()
+    for position in range(500):
+        index.add(
+            "news",
+            news(
+                position,
+                " ".join(random.choices(words, k=3)),
+                " ".join(random.choices(words, k=random.randint(0, 20))),
+            ),
+        )
+    for query in ("stake", "pool vote", "tok", "wallet node stak*"):
+        assert keys(index.search(query, limit=10)) == exhaustive(index, query, 10)
+
+
+def test_ties_across_lists_go_to_the_newest():
+    index = SearchIndex()
+    index.add("news", news(1, "car"))
+    index.add("news", news(2, "cat"))
+    assert keys(index.search("ca", limit=1)) == ["https://example.com/2"]
+
+
+def test_bulk_load_weights_postings_like_a_reweighted_index():
+    items = [news(position, f"cardano release {position}", "node " * (position % 5)) for position in range(50)]
+    incremental = SearchIndex()
+    for item in items:
+        incremental.add("news", item)
+    incremental.reweight()
+    bulk = SearchIndex()
+    with bulk.bulk():
+        for item in items:
+            bulk.add("news", item)
+    assert bulk.ready
+    assert bulk.ranked == incremental.ranked
+    assert bulk.vocabulary == incremental.vocabulary
+
+
+def test_evicts_the_oldest_by_timestamp_not_arrival():
+    index = SearchIndex(max_items=3)
+    now = time.time()
+    index.add("news", news(1, "one", published=now - 10))
+    index.add("news", news(2, "two", published=now - 1000))
+    index.add("news", news(3, "three", published=now - 5))
+    index.add("news", news(4, "four", published=now - 1))
+    assert ("news", "https://example.com/2") not in index.documents
+    assert len(index) == 3
+
+
+def test_late_items_past_max_age_are_evicted():
+    index = SearchIndex(max_age=60)
+    index.add("news", news(1, "fresh", published=time.time()))
+    index.add("news", news(2, "stale", published=time.time() - 3600))
+    assert keys(index.search("stale")) == []
+    assert len(index) == 1
+
+
+def test_replacing_an_item_keeps_one_document():
+    index = SearchIndex()
+    for _ in range(3):
+        index.add("news", news(1, "cardano update"))
+    index.add("news", news(1, "cardano release"))
+    assert len(index) == 1
+    assert keys(index.search("release")) == ["https://example.com/1"]
+    assert index.search("update") == []
+
+
+def test_warm_up_yields_to_the_loop_and_indexes_items_added_meanwhile(monkeypatch):
+    stored = [{"source": "news", "item": news(position, f"stored {position}")} for position in range(2000)]
+
+    async def query_items(redis_client, since=None, cursor=None, limit=50):
+        start = cursor or 0
+        return stored[start : start + limit], start + limit, start + limit < len(stored)
+
+    monkeypatch.setattr(search, "query_items", query_items)
+
+    async def run():
+        index = SearchIndex()
+        warming = asyncio.ensure_future(warm_index(index, None))
+        ticks = 0
+        while not warming.done():
+            if ticks == 1:
+                index.add("news", news(5000, "live update"))
+            ticks += 1
+            await asyncio.sleep(0)
+        return index, ticks
+
+    index, ticks = asyncio.run(run())
+    assert ticks > 4
+    assert index.ready
+    assert len(index) == 2001
+    assert keys(index.search("live")) == ["https://example.com/5000"]
+    assert len(index.search("stored", limit=50)) == 50
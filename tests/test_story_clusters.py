@@ -0,0 +1,146 @@
+import random
+import threading
+from app.celery_app.tasks.story_clusters import (
+    BANDS,
+    MAX_DISTANCE,
+    StoryClusters,
+    bands,
+    distance,
+    features,
+    simhash,
+)
+from app.utils.records import Article
+
+VOCABULARY = [f"word{index}" for index in range(5000)]
+
+
+def make_article(link, title, description, organization="coindesk.com"):
+    return Article(
+        organization=organization,
+        title=title,
+        link=link,
+        description=description,
+        published=1714996800,
+        author="",
+        image="no_image",
+        keywords=[],
+        story_id=None,
+        alternates=[],
+    )
+
+
+def make_story(rng, index):
+    return " ".join(rng.choices(VOCABULARY, k=10)), " ".join(rng.choices(VOCABULARY, k=60))
+
+
+def rewrite(rng, title, description):
+    # Another outlet's take: one word changed and the last one dropped
+    words = description.split()
+    words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    return title, " ".join(words[:-1])
+
+
+def fingerprint(title, description):
+    return simhash(features(make_article("https://example.com", title, description)))
+
+
+def test_near_duplicates_share_a_band():
+    rng = random.Random(1)
+    for _ in range(500):
+        a = rng.getrandbits(64)
+        flipped = rng.sample(range(64), rng.randint(0, MAX_DISTANCE))
+        b = a
+        for position in flipped:
+            b ^= 1 << position
+        assert distance(a, b) == len(flipped)
+        assert any(x == y for x, y in zip(bands(a), bands(b)))
+    assert BANDS > MAX_DISTANCE
+
+
+def test_rewrites_match_and_unrelated_stories_do_not():
+    rng = random.Random(1)
+    stories = [make_story(rng, index) for index in range(300)]
+    prints = [fingerprint(*story) for story in stories]
+    rewrites = [fingerprint(*rewrite(rng, *story)) for story in stories]
+    matched = sum(distance(a, b) <= MAX_DISTANCE for a, b in zip(prints, rewrites))
+    assert matched / len(stories) >= 0.9
+    false_matches = sum(
+        distance(prints[i], prints[j]) <= MAX_DISTANCE
+        for i in range(len(prints))
+        for j in range(i + 1, len(prints))
+    )
+    assert false_matches == 0
+
+
+def outlet_articles(count, seed=3):
+    rng = random.Random(seed)
+    title, description = make_story(rng, 0)
+    articles = [make_article("https://coindesk.com/story", title, description)]
+    for index in range(1, count):
+        rewritten = rewrite(rng, title, description)
+        assert distance(fingerprint(title, description), fingerprint(*rewritten)) <= MAX_DISTANCE
+        articles.append(
+            make_article(f"https://outlet{index}.com/story", *rewritten, f"outlet{index}.com")
+        )
+    return articles
+
+
+def test_rewrites_join_the_first_story(redis_client):
+    clusters = StoryClusters(redis_client)
+    original, copy = outlet_articles(2)
+    [canonical] = clusters.cluster([original])
+    assert canonical.link == original.link and canonical.alternates == []
+
+    [canonical] = clusters.cluster([copy])
+    assert canonical.link == original.link
+    assert [alternate["link"] for alternate in canonical.alternates] == [copy.link]
+
+    unrelated = make_article("https://other.com/story", *make_story(random.Random(9), 0))
+    [other] = clusters.cluster([unrelated])
+    assert other.story_id != canonical.story_id
+
+
+def test_articles_in_one_batch_are_grouped(redis_client):
+    articles = outlet_articles(3)
+    [canonical] = StoryClusters(redis_client).cluster(articles)
+    assert canonical.link == articles[0].link
+    assert len(canonical.alternates) == 2
+
+
+def test_updating_the_canonical_article_keeps_its_alternates(redis_client):
+    clusters = StoryClusters(redis_client)
+    original, copy = outlet_articles(2)
+    clusters.cluster([original, copy])
+    original.author = "Jane Doe"
+    [canonical] = clusters.cluster([original])
+    assert canonical.author == "Jane Doe"
+    assert [alternate["link"] for alternate in canonical.alternates] == [copy.link]
+
+
+def test_concurrent_outlets_form_one_story(redis_client):
+    articles = outlet_articles(8)
+    start = threading.Barrier(len(articles))
+    results = {}
+
+    def run(article):
+        start.wait()
+        results[article.link] = StoryClusters(redis_client).cluster([article])
+
+    threads = [threading.Thread(target=run, args=(article,)) for article in articles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    story_ids = {
+        canonical.story_id for canonicals in results.values() for canonical in canonicals
+    }
+    assert len(story_ids) == 1
+    # Whichever article got in first is canonical; every other one is an
+    # alternate, none lost to a concurrent write
+    [canonical] = StoryClusters(redis_client).cluster(
+        [article for article in articles if StoryClusters.own_story_id(article) in story_ids]
+    )
+    assert {alternate["link"] for alternate in canonical.alternates} == {
+        article.link for article in articles
+    } - {canonical.link}
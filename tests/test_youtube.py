@@ -0,0 +1,56 @@
+import asyncio
+import redis.asyncio
+from app.celery_app.tasks.fetcher import FetchResponse
+from app.celery_app.tasks.youtube import cached_search
+from app.celery_app.tasks.youtube_quota import QuotaBudget, SearchCache
+from tests.conftest import TEST_REDIS_URL
+
+
+class StubFetcher:
+    def __init__(self, response):
+        self.response = response
+        self.params = []
+
+    async def fetch(self, url, params=None):
+        self.params.append(params)
+        return self.response
+
+
+def search(fetcher, interval=0):
+    async def run():
+        client = redis.asyncio.Redis.from_url(TEST_REDIS_URL)
+        try:
+            budget = QuotaBudget(client)
+            cache = SearchCache(client)
+            video_ids = await cached_search(
+                fetcher, budget, cache, "cardano", "completed", 5, "date", interval
+            )
+            return video_ids, await cache.get("cardano", "completed", "date")
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+def test_search_results_are_cached_with_a_watermark(redis_client):
+    fetcher = StubFetcher(FetchResponse(200, {}, {"items": [{"id": {"videoId": "a"}}]}))
+    video_ids, entry = search(fetcher)
+    assert video_ids == ["a"]
+    assert entry["video_ids"] == ["a"]
+    assert "publishedAfter" not in fetcher.params[0]
+
+    search(fetcher)
+    assert fetcher.params[1]["publishedAfter"] == entry["published_after"]
+
+
+def test_failed_search_leaves_the_cache_untouched(redis_client):
+    _, before = search(StubFetcher(FetchResponse(200, {}, {"items": [{"id": {"videoId": "a"}}]})))
+    video_ids, after = search(StubFetcher(None))
+    assert video_ids == ["a"]
+    assert after == before
+
+
+def test_failed_search_on_a_cold_cache_stores_nothing(redis_client):
+    video_ids, entry = search(StubFetcher(None))
+    assert video_ids == []
+    assert entry is None